@@ -0,0 +1,27 @@
+import itertools
+
+'''
+    包围盒的扫描排序 (sort and sweep)，不依赖pythonocc，供stp_visualizer做交点检测的粗筛。
+    包围盒为元组 (xmin, ymin, zmin, xmax, ymax, zmax)，无穷大的包围盒用 ±inf 表示。
+'''
+
+def find_candidate_pairs(boxes):
+    """
+    扫描排序 (sort and sweep) 求包围盒相交的边对。
+
+    按 xmin 排序后，每个盒子只需向后扫描到 xmin 超过自身 xmax 为止，
+    再检查 y、z 方向是否重叠。返回按 (i, j) 升序排列的下标对，i < j。
+    """
+    order = sorted(range(len(boxes)), key=lambda k: boxes[k][0])
+    pairs = []
+    for pos, i in enumerate(order):
+        _, ymin, zmin, xmax, ymax, zmax = boxes[i]
+        for j in itertools.islice(order, pos + 1, None):
+            other = boxes[j]
+            if other[0] > xmax:
+                break
+            if other[1] <= ymax and ymin <= other[4] and other[2] <= zmax and zmin <= other[5]:
+                pairs.append((i, j) if i < j else (j, i))
+    # 与暴力遍历的顺序一致，去重时保留的交点才会相同
+    pairs.sort()
+    return pairs
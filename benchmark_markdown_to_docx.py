@@ -0,0 +1,226 @@
+"""
+markdown_to_docx 基准测试
+
+生成可复现的合成markdown语料（段落、大表格、HTML表格、图片、长代码块、深层列表），
+图片用PIL离线生成。分别统计分块和各个 process_* 阶段的耗时，输出每秒行数、
+峰值内存和docx大小。
+
+用法: python benchmark_markdown_to_docx.py --scale 5 [--streaming] [--json result.json]
+"""
+import argparse
+import functools
+import json
+import random
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+import markdown_to_docx
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 被计时的阶段：markdown_to_docx 中的模块级函数名
+STAGES = [
+    'process_heading',
+    'process_paragraph',
+    'process_inline_formatting',
+    'process_table',
+    'process_html_content',
+    'process_html_table',
+    'process_image_from_path',
+    'process_markdown_image_line',
+    'process_code_block',
+    'process_list',
+    'process_quote',
+    'build_table',
+    'prepare_image',
+]
+
+WORDS = ('数据 模型 结构 分析 系统 接口 测试 性能 文档 图片 表格 转换 '
+         'alpha beta gamma delta engine parser layout render').split()
+
+
+def make_images(image_dir, count, rng):
+    """生成不同尺寸的PNG和JPEG图片，模拟OCR裁剪出的大图"""
+    image_dir.mkdir(parents=True, exist_ok=True)
+    names = []
+    for i in range(count):
+        width, height = rng.choice([(640, 480), (1600, 1200), (3000, 2000)])
+        img = Image.new('RGB', (width, height), (255, 255, 255))
+        draw = ImageDraw.Draw(img)
+        for _ in range(40):
+            x0, y0 = rng.randrange(width), rng.randrange(height)
+            draw.rectangle([x0, y0, x0 + rng.randrange(20, 400), y0 + rng.randrange(20, 200)],
+                           outline=(rng.randrange(256), 0, 0), width=3)
+        name = f"img_{i}.{'jpg' if i % 2 else 'png'}"
+        img.save(image_dir / name)
+        names.append(name)
+    return names
+
+
+def sentence(rng, words=12):
+    parts = [rng.choice(WORDS) for _ in range(words)]
+    parts[rng.randrange(words)] = f"**{rng.choice(WORDS)}**"
+    parts[rng.randrange(words)] = f"*{rng.choice(WORDS)}*"
+    parts[rng.randrange(words)] = f"`{rng.choice(WORDS)}`"
+    return ' '.join(parts)
+
+
+def generate_corpus(path, scale=1, seed=0):
+    """
+    生成合成markdown语料
+
+    Args:
+        path (Path): 输出的markdown文件路径，图片放在同目录的imgs下
+        scale (int): 规模系数，各类内容的数量与其成正比
+        seed (int): 随机种子，保证语料可复现
+
+    Returns:
+        int: 语料行数
+    """
+    rng = random.Random(seed)
+    images = make_images(path.parent / 'imgs', max(4, 2 * scale), rng)
+    lines = []
+    for section in range(20 * scale):
+        lines.append(f"# 第{section}章 {rng.choice(WORDS)}")
+        lines.append('')
+        for _ in range(10):
+            lines.append(sentence(rng, rng.randrange(8, 40)))
+            lines.append('')
+        if section % 4 == 0:
+            # 大的管道表格
+            cols = 6
+            lines.append('| ' + ' | '.join(f"列{c}" for c in range(cols)) + ' |')
+            lines.append('|' + '---|' * cols)
+            for r in range(200):
+                lines.append('| ' + ' | '.join(f"{rng.choice(WORDS)}{r}" for _ in range(cols)) + ' |')
+            lines.append('')
+        if section % 4 == 1:
+            # 带合并单元格的HTML表格
+            rows = ['<tr><td rowspan="2">合并</td><td colspan="2">标题</td></tr>']
+            rows += [f"<tr><td>{rng.choice(WORDS)}</td><td>{r}</td></tr>" for r in range(50)]
+            lines.append(f"<table>{''.join(rows)}</table>")
+            lines.append('')
+        if section % 2 == 0:
+            image = rng.choice(images)
+            lines.append(f'<div style="text-align: center;"><img src="imgs/{image}" alt="Image" width="60%" /></div>')
+            lines.append('')
+            lines.append(f"![图{section}](imgs/{rng.choice(images)})")
+            lines.append('')
+        if section % 3 == 0:
+            lines.append('```python')
+            lines.extend(f"    value_{i} = compute({i}, '{rng.choice(WORDS)}')" for i in range(80))
+            lines.append('```')
+            lines.append('')
+        if section % 3 == 1:
+            for depth in range(30):
+                marker = f"{depth + 1}." if depth % 2 else '-'
+                lines.append('  ' * (depth % 6) + f"{marker} {sentence(rng, 6)}")
+            lines.append('')
+        lines.append(f"> {sentence(rng, 10)}")
+        lines.append('')
+    path.write_text('\n'.join(lines), encoding='utf-8')
+    return len(lines)
+
+
+def instrument(timings, calls):
+    """包装 markdown_to_docx 的阶段函数，累计耗时（包含内部调用的其他阶段）"""
+    originals = {}
+    for name in STAGES:
+        func = getattr(markdown_to_docx, name)
+        originals[name] = func
+
+        @functools.wraps(func)
+        def wrapper(*args, __name=name, __func=func, **kwargs):
+            start = time.perf_counter()
+            try:
+                return __func(*args, **kwargs)
+            finally:
+                timings[__name] += time.perf_counter() - start
+                calls[__name] += 1
+
+        setattr(markdown_to_docx, name, wrapper)
+    return originals
+
+
+def restore(originals):
+    for name, func in originals.items():
+        setattr(markdown_to_docx, name, func)
+
+
+def run_benchmark(markdown_path, line_count, streaming=False):
+    # 单独计时分块
+    start = time.perf_counter()
+    with open(markdown_path, 'r', encoding='utf-8') as f:
+        block_count = sum(1 for _ in markdown_to_docx.tokenize_markdown(f))
+    tokenize_time = time.perf_counter() - start
+
+    timings = defaultdict(float)
+    calls = defaultdict(int)
+    originals = instrument(timings, calls)
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        docx_path = markdown_to_docx.markdown_to_docx_with_images(
+            markdown_path, markdown_path.parent / 'out', streaming=streaming)
+        total_time = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        restore(originals)
+
+    return {
+        'lines': line_count,
+        'blocks': block_count,
+        'streaming': streaming,
+        'total_seconds': total_time,
+        'lines_per_sec': line_count / total_time,
+        'tokenize_seconds': tokenize_time,
+        'peak_memory_mb': peak / 1024 / 1024,
+        # Linux下ru_maxrss单位为KB，包含PIL解码图片等tracemalloc统计不到的内存
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else None,
+        'docx_bytes': Path(docx_path).stat().st_size,
+        'stages': {name: {'seconds': timings[name], 'calls': calls[name]} for name in STAGES if calls[name]},
+    }
+
+
+def print_report(result):
+    print(f"行数 {result['lines']}，块数 {result['blocks']}，流式 {result['streaming']}")
+    print(f"总耗时 {result['total_seconds']:.2f}s，{result['lines_per_sec']:.0f} 行/秒")
+    print(f"分块耗时 {result['tokenize_seconds']:.3f}s")
+    print(f"峰值内存(tracemalloc) {result['peak_memory_mb']:.1f} MB，docx大小 {result['docx_bytes'] / 1024:.0f} KB")
+    if result['peak_rss_mb'] is not None:
+        print(f"进程峰值RSS {result['peak_rss_mb']:.1f} MB")
+    print(f"{'阶段':<30} {'调用次数':>8} {'耗时(s)':>10}")
+    for name, stage in sorted(result['stages'].items(), key=lambda item: -item[1]['seconds']):
+        print(f"{name:<30} {stage['calls']:>8} {stage['seconds']:>10.3f}")
+    print("（阶段耗时包含其内部调用的其他阶段，如 process_html_content 包含 process_image_from_path）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='markdown_to_docx 基准测试')
+    parser.add_argument('--scale', type=int, default=1, help='语料规模系数')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--streaming', action='store_true', help='使用流式模式')
+    parser.add_argument('--workdir', help='语料目录，默认使用临时目录')
+    parser.add_argument('--json', help='把结果写入JSON文件，便于对比')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(args.workdir or tmp)
+        workdir.mkdir(parents=True, exist_ok=True)
+        markdown_path = workdir / 'benchmark.md'
+        line_count = generate_corpus(markdown_path, args.scale, args.seed)
+        result = run_benchmark(markdown_path, line_count, args.streaming)
+
+    print_report(result)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
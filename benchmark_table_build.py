@@ -0,0 +1,54 @@
+"""
+表格构建微基准：对比逐格 table.cell(r, c).text 赋值与 build_table 批量构建
+
+用法: python benchmark_table_build.py --rows 50 100 200 --cols 8
+逐格赋值是平方级的，几百行以上会非常慢
+"""
+import argparse
+import time
+
+from docx import Document
+
+from markdown_to_docx import build_table
+
+
+def build_table_by_cell(doc, rows):
+    """旧实现：逐个单元格赋值"""
+    max_cols = max(len(row) for row in rows)
+    table = doc.add_table(rows=len(rows), cols=max_cols)
+    table.style = 'Table Grid'
+    for row_idx, row_data in enumerate(rows):
+        for col_idx, cell_data in enumerate(row_data):
+            table.cell(row_idx, col_idx).text = cell_data
+    return table
+
+
+def make_rows(row_count, col_count):
+    return [[f"r{r}c{c}" for c in range(col_count)] for r in range(row_count)]
+
+
+def timed(func, rows):
+    doc = Document()
+    start = time.perf_counter()
+    table = func(doc, rows)
+    return time.perf_counter() - start, table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='表格构建微基准')
+    parser.add_argument('--rows', type=int, nargs='+', default=[50, 100, 200])
+    parser.add_argument('--cols', type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"{'行数':>8} {'逐格赋值(s)':>14} {'批量构建(s)':>14} {'加速比':>8}")
+    for row_count in args.rows:
+        rows = make_rows(row_count, args.cols)
+        old_time, old_table = timed(build_table_by_cell, rows)
+        new_time, new_table = timed(build_table, rows)
+
+        # 两种实现的单元格内容必须一致
+        old_text = [[cell.text for cell in row.cells] for row in old_table.rows]
+        new_text = [[cell.text for cell in row.cells] for row in new_table.rows]
+        assert old_text == new_text, "批量构建结果与逐格赋值不一致"
+
+        print(f"{row_count:>8} {old_time:>14.3f} {new_time:>14.3f} {old_time / new_time:>8.1f}x")
@@ -1,19 +1,55 @@
 import re
 import os
+import html
+import io
+import sys
+import glob
+import math
+import time
+import hashlib
+import logging
+import argparse
+import zipfile
+import threading
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
 from pathlib import Path
 from docx import Document
-from docx.shared import Inches, Pt
+from docx.shared import Inches, Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml import parse_xml
+from docx.oxml import OxmlElement
+from docx.oxml.ns import nsdecls, qn
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from docx.opc.pkgwriter import _ContentTypesItem
+from lxml import etree
+from xml.sax.saxutils import escape
 from PIL import Image
 from bs4 import BeautifulSoup
 
-def markdown_to_docx_with_images(markdown_file_path, output_dir=None):
+logger = logging.getLogger(__name__)
+
+# 图片预处理配置：按目标打印DPI缩放后再嵌入docx
+IMAGE_TARGET_DPI = int(os.environ.get("DOCX_IMAGE_DPI", 200))
+IMAGE_JPEG_QUALITY = int(os.environ.get("DOCX_IMAGE_JPEG_QUALITY", 85))
+IMAGE_CACHE_SIZE = int(os.environ.get("DOCX_IMAGE_CACHE_SIZE", 128))
+# python-docx能直接嵌入的图片格式，其他格式（如WEBP）需要转码
+DOCX_IMAGE_FORMATS = {'PNG', 'JPEG', 'GIF', 'BMP', 'TIFF'}
+
+# 流式模式下每渲染多少个块就把正文XML写出一次
+STREAM_FLUSH_BLOCKS = int(os.environ.get("DOCX_STREAM_FLUSH_BLOCKS", 200))
+
+def markdown_to_docx_with_images(markdown_file_path, output_dir=None, streaming=False):
     """
     将markdown文件转换为docx文件，并处理图片（支持Markdown和HTML格式）
     
     Args:
         markdown_file_path (str): markdown文件路径
         output_dir (str, optional): 输出目录，默认为markdown文件所在目录
+        streaming (bool): 流式模式，逐行读取markdown并分批把正文写入docx，
+            内存占用与文件大小无关，适合整本书的OCR结果
     
     Returns:
         str: 生成的docx文件路径
@@ -33,6 +69,11 @@ def markdown_to_docx_with_images(markdown_file_path, output_dir=None):
     
     docx_file_path = output_dir / f"{markdown_path.stem}.docx"
     
+    if streaming:
+        stream_markdown_to_docx(markdown_path, docx_file_path)
+        logger.info("转换完成: %s", docx_file_path)
+        return str(docx_file_path)
+    
     # 读取markdown文件
     with open(markdown_path, 'r', encoding='utf-8') as f:
         markdown_content = f.read()
@@ -43,99 +84,383 @@ def markdown_to_docx_with_images(markdown_file_path, output_dir=None):
     # 设置文档样式
     setup_document_styles(doc)
     
-    # 解析markdown内容
+    # 解析markdown内容并渲染
     lines = markdown_content.split('\n')
-    i = 0
+    render_blocks(doc, tokenize_markdown(lines), markdown_path.parent)
+    
+    # 保存文档
+    doc.save(docx_file_path)
+    logger.info("转换完成: %s", docx_file_path)
+    return str(docx_file_path)
+
+def stream_markdown_to_docx(markdown_path, docx_file_path, flush_blocks=STREAM_FLUSH_BLOCKS):
+    """
+    流式转换：正文XML直接写入zip中的word/document.xml条目
+    
+    每渲染flush_blocks个块，就把body中已生成的元素序列化写出并从树上移除，
+    python-docx的文档树始终只保留少量元素。其余部件（样式、图片、关系等）
+    在正文写完后按python-docx保存时的方式写入。
+    """
+    doc = Document()
+    setup_document_styles(doc)
+    body = doc.element.body
+    
+    # 以只含sectPr的空文档为模板，切出body前后的XML
+    document_xml = etree.tostring(doc.element, encoding='UTF-8', standalone=True)
+    sect_pr_start = document_xml.index(b'<w:sectPr')
+    head = document_xml[:document_xml.index(b'<w:body>') + len(b'<w:body>')]
+    tail = document_xml[sect_pr_start:]
+    # 根元素上已声明的命名空间，子元素单独序列化时会重复声明，写出前去掉
+    root_decls = [f' xmlns:{prefix}="{uri}"'.encode() for prefix, uri in doc.element.nsmap.items() if prefix]
     
-    while i < len(lines):
-        line = lines[i].rstrip()
+    with zipfile.ZipFile(docx_file_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        with zf.open(doc.part.partname.membername, 'w') as stream:
+            stream.write(head)
+            # python-docx按树中现有的最大id分配图片的wp:docPr id（名称为"Picture {id}"），
+            # 已写出的元素移除后id会重新从小开始，写出前按全文连续编号重写，避免重复id
+            drawing_ids = iter(range(1, sys.maxsize))
+            
+            def flush():
+                for child in list(body):
+                    if child.tag.endswith('}sectPr'):
+                        continue
+                    for doc_pr in child.iter(qn('wp:docPr')):
+                        drawing_id = next(drawing_ids)
+                        doc_pr.set('id', str(drawing_id))
+                        doc_pr.set('name', f"Picture {drawing_id}")
+                    stream.write(_strip_root_decls(etree.tostring(child, encoding='UTF-8'), root_decls))
+                    body.remove(child)
+            
+            with open(markdown_path, 'r', encoding='utf-8') as f:
+                for count, block in enumerate(tokenize_markdown(f), 1):
+                    render_block(doc, block, markdown_path.parent)
+                    if count % flush_blocks == 0:
+                        flush()
+            flush()
+            stream.write(tail)
         
+        # 写入其余部件及关系，与 PackageWriter.write 一致
+        package = doc.part.package
+        parts = list(package.iter_parts())
+        for part in parts:
+            part.before_marshal()
+        zf.writestr(CONTENT_TYPES_URI.membername, _ContentTypesItem.from_parts(parts).blob)
+        zf.writestr(PACKAGE_URI.rels_uri.membername, package.rels.xml)
+        for part in parts:
+            if part is not doc.part:
+                zf.writestr(part.partname.membername, part.blob)
+            if len(part.rels):
+                zf.writestr(part.partname.rels_uri.membername, part.rels.xml)
+
+def _strip_root_decls(xml, root_decls):
+    # 只处理第一个标签，属性值中的'>'会被转义，第一个'>'即为标签结束
+    end = xml.index(b'>')
+    first_tag = xml[:end]
+    for decl in root_decls:
+        first_tag = first_tag.replace(decl, b'')
+    return first_tag + xml[end:]
+
+# 块类型：heading / code / table / list / quote / html / image / paragraph
+Block = namedtuple('Block', ['kind', 'data'])
+
+LIST_ITEM_PATTERN = re.compile(r'^\d+\. ')
+TABLE_SEPARATOR_PATTERN = re.compile(r'^\|?\s*:?-+:?\s*\|')
+
+
+class LineReader:
+    """逐行读取，支持回退一行，使分块时每行只被读取一次"""
+
+    def __init__(self, lines):
+        self._lines = iter(lines)
+        self._pending = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._pending is not None:
+            line, self._pending = self._pending, None
+            return line
+        return next(self._lines).rstrip('\r\n')
+
+    def push_back(self, line):
+        self._pending = line
+
+
+def tokenize_markdown(lines):
+    """
+    单遍扫描markdown行，生成类型化的块列表，与docx渲染分离
+
+    Args:
+        lines (iterable): markdown文本行，可以是列表或逐行读取的文件对象
+
+    Yields:
+        Block: (kind, data)
+    """
+    reader = LineReader(lines)
+    for raw_line in reader:
+        line = raw_line.rstrip()
+
         # 处理空行
         if not line:
-            i += 1
             continue
-        print(line)
-        # 处理HTML格式的图片（包括div包装的图片）
-        if '<img' in line or '<div' in line:
-            print("befor:",i)
-            i = process_html_content(doc, lines, i, markdown_path.parent)
-            print("after:",i)
-            continue
-        
+
+        # 处理HTML片段（div包装的图片、表格等）
+        if '<img' in line or '<div' in line or '<table' in line:
+            yield Block('html', collect_html(reader, raw_line))
+
         # 处理标题
         elif line.startswith('#'):
             level = len(line) - len(line.lstrip('#'))
             title_text = line.lstrip('#').strip()
             if title_text:
-                heading = doc.add_heading(title_text, level=min(level, 6))
-                heading.alignment = WD_ALIGN_PARAGRAPH.LEFT
-        
+                yield Block('heading', (min(level, 6), title_text))
+
         # 处理Markdown格式的图片
         elif '![' in line and '](' in line:
-            process_markdown_image_line(doc, line, markdown_path.parent)
-        
+            yield Block('image', line)
+
         # 处理代码块
         elif line.startswith('```'):
-            i = process_code_block(doc, lines, i)
-            continue
-        
+            code_lines = []
+            for code_line in reader:
+                # 闭合的```一并消费
+                if code_line.startswith('```'):
+                    break
+                code_lines.append(code_line)
+            yield Block('code', code_lines)
+
         # 处理表格
         elif '|' in line and line.count('|') >= 2:
-            i = process_table(doc, lines, i)
-            continue
-        
+            yield Block('table', collect_table(reader, raw_line))
+
         # 处理列表
-        elif line.startswith(('- ', '* ', '+ ')) or re.match(r'^\d+\. ', line):
-            i = process_list(doc, lines, i)
-            continue
-        
+        elif line.startswith(('- ', '* ', '+ ')) or LIST_ITEM_PATTERN.match(line):
+            yield Block('list', collect_list(reader, raw_line))
+
         # 处理引用
         elif line.startswith('>'):
-            process_quote(doc, line)
-        
+            yield Block('quote', line)
+
         # 处理普通段落
         else:
-            process_paragraph(doc, line)
-        
-        i += 1
-    
-    # 保存文档
-    doc.save(docx_file_path)
-    print(f"转换完成: {docx_file_path}")
-    return str(docx_file_path)
+            yield Block('paragraph', line)
 
-def process_html_content(doc, lines, start_index, base_path):
-    """
-    处理HTML内容，特别是图片标签
-    """
-    i = start_index
-    html_content = ""
-    max_lines = 10  # 添加最大行数限制，防止死循环
-    lines_processed = 0
-    
-    # 收集HTML内容（可能跨多行）
-    while i < len(lines) and lines_processed < max_lines:
-        line = lines[i]
-        html_content += line + "\n"
-        lines_processed += 1
-        i += 1
-        # 如果是单行HTML或者遇到闭合标签，停止收集
-        if ('<img' in line and '/>' in line) or \
-           ('</div>' in line) or \
-           ('</p>' in line) or \
-           ('</table>' in line) or \
-           ('</html>' in line) or \
-           (not line.strip().startswith('<') and html_content.strip() and lines_processed > 1):
+
+HTML_ROOT_TAG_PATTERN = re.compile(r'<([a-zA-Z][\w-]*)')
+
+def collect_html(reader, first_line):
+    """
+    收集HTML内容（可能跨多行）
+    
+    一直收集到第一个标签对应的闭合标签为止，不限制行数；第一个标签是
+    img等自闭合标签时只取当前行。未闭合时遇到空行结束，与CommonMark的HTML块规则一致。
+    """
+    match = HTML_ROOT_TAG_PATTERN.search(first_line)
+    root = match.group(1).lower() if match else None
+    if root is None or root in HTML_VOID_TAGS:
+        return first_line + "\n"
+    open_pattern = re.compile(rf'<{root}\b', re.IGNORECASE)
+    close_pattern = re.compile(rf'</{root}\s*>', re.IGNORECASE)
+    
+    parts = []
+    depth = 0
+    line = first_line
+    while line is not None:
+        parts.append(line)
+        depth += len(open_pattern.findall(line)) - len(close_pattern.findall(line))
+        if depth <= 0:
+            break
+        line = next(reader, None)
+        if line is not None and not line.strip():
             break
+    return "\n".join(parts) + "\n"
+
+
+def collect_table(reader, first_line):
+    """收集表格行并拆分单元格，遇到不含|的行时回退该行"""
+    rows = []
+    line = first_line
+    while line is not None and '|' in line:
+        line = line.strip()
+        if line and not TABLE_SEPARATOR_PATTERN.match(line):  # 跳过分隔行
+            cells = [cell.strip() for cell in line.split('|')]
+            # 移除首尾空元素
+            if cells and not cells[0]:
+                cells = cells[1:]
+            if cells and not cells[-1]:
+                cells = cells[:-1]
+            if cells:
+                rows.append(cells)
+        line = next(reader, None)
+    if line is not None:
+        reader.push_back(line)
+    return rows
+
+
+def collect_list(reader, first_line):
+    """收集连续的列表项（允许中间有空行），遇到其他内容时回退该行"""
+    list_items = []
+    line = first_line
+    while line is not None:
+        stripped = line.strip()
+        if stripped:
+            if stripped.startswith(('- ', '* ', '+ ')):
+                list_items.append(('bullet', stripped[2:].strip()))
+            elif LIST_ITEM_PATTERN.match(stripped):
+                list_items.append(('number', LIST_ITEM_PATTERN.sub('', stripped).strip()))
+            else:
+                reader.push_back(line)
+                break
+        line = next(reader, None)
+    return list_items
+
+
+def render_blocks(doc, blocks, base_path):
+    """把块列表渲染到python-docx文档"""
+    for block in blocks:
+        render_block(doc, block, base_path)
+
 
-    # 如果达到最大行数限制，记录警告
-    if lines_processed >= max_lines:
-        print(f"警告：HTML内容处理达到最大行数限制({max_lines}行)，可能存在格式问题")
+def render_block(doc, block, base_path):
+    kind, data = block
+    if kind == 'html':
+        process_html_content(doc, data, base_path)
+    elif kind == 'heading':
+        process_heading(doc, *data)
+    elif kind == 'image':
+        process_markdown_image_line(doc, data, base_path)
+    elif kind == 'code':
+        process_code_block(doc, data)
+    elif kind == 'table':
+        process_table(doc, data)
+    elif kind == 'list':
+        process_list(doc, data)
+    elif kind == 'quote':
+        process_quote(doc, data)
+    else:
+        process_paragraph(doc, data)
+
+# 快速路径能处理的标签，其他标签交给BeautifulSoup
+HTML_VOID_TAGS = {'img', 'br', 'hr'}
+HTML_FAST_TAGS = HTML_VOID_TAGS | {
+    'html', 'body', 'div', 'p', 'center', 'span', 'b', 'strong', 'i', 'em',
+    'table', 'thead', 'tbody', 'tfoot', 'tr', 'td', 'th',
+}
+HTML_TOKEN_PATTERN = re.compile(r'<(/?)([a-zA-Z][\w-]*)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>|<|[^<]+')
+HTML_ATTR_PATTERN = re.compile(r'([\w:-]+)(?:\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+)))?')
+
+def _html_attrs(attr_text):
+    attrs = {}
+    for name, double, single, bare in HTML_ATTR_PATTERN.findall(attr_text):
+        attrs[name.lower()] = html.unescape(double or single or bare)
+    return attrs
+
+def parse_html_fragment(html_content):
+    """
+    快速解析OCR输出中常见的HTML片段：div包装的img和（不嵌套的）table
+    
+    Returns:
+        tuple: (图片列表[(src, alt, width)], 表格列表[行列表[(文本, colspan, rowspan)]], 其余文本)；
+        遇到不认识的标签、注释或嵌套表格时返回None，由调用方回退到BeautifulSoup
+    """
+    images = []
+    tables = []
+    text_parts = []
+    rows = None  # 当前表格的行，不在表格内时为None
+    cell = None  # 当前单元格 [文本片段, colspan, rowspan]
+    
+    def close_cell():
+        nonlocal cell
+        if cell is not None:
+            if rows is None or not rows:
+                return False
+            rows[-1].append((''.join(cell[0]).strip(), cell[1], cell[2]))
+            cell = None
+        return True
     
+    for match in HTML_TOKEN_PATTERN.finditer(html_content):
+        tag = match.group(2)
+        if tag is None:
+            token = match.group(0)
+            if token == '<':
+                return None  # 注释、doctype或残缺标签
+            text = html.unescape(token)
+            if cell is not None:
+                cell[0].append(text)
+            elif rows is None:
+                text_parts.append(text)
+            elif text.strip():
+                return None  # 表格内单元格外的文本
+            continue
+        
+        tag = tag.lower()
+        if tag not in HTML_FAST_TAGS:
+            return None
+        closing = match.group(1) == '/'
+        
+        if tag == 'img':
+            attrs = _html_attrs(match.group(3))
+            images.append((attrs.get('src', ''), attrs.get('alt', ''), attrs.get('width', '')))
+        elif tag == 'table':
+            if not closing:
+                if rows is not None:
+                    return None  # 嵌套表格
+                rows = []
+            else:
+                if rows is None or not close_cell():
+                    return None
+                tables.append([row for row in rows if row])
+                rows = None
+        elif tag == 'tr':
+            if rows is None or not close_cell():
+                return None
+            if not closing:
+                rows.append([])
+        elif tag in ('td', 'th'):
+            if rows is None or not close_cell():
+                return None
+            if not closing:
+                if not rows:
+                    rows.append([])
+                attrs = _html_attrs(match.group(3))
+                cell = [[], _span_value(attrs.get('colspan')), _span_value(attrs.get('rowspan'))]
+    
+    if rows is not None:
+        # 未闭合的表格同样收下
+        if not close_cell():
+            return None
+        tables.append([row for row in rows if row])
+    return images, tables, ''.join(text_parts).strip()
+
+def process_html_content(doc, html_content, base_path):
+    """
+    处理HTML内容，特别是图片标签和表格
+    
+    常见的OCR片段走parse_html_fragment快速路径，其余回退到BeautifulSoup
+    """
+    logger.debug("html_content: %s", html_content)
+    fragment = parse_html_fragment(html_content)
+    if fragment is None:
+        process_html_content_with_soup(doc, html_content, base_path)
+        return
+    
+    images, tables, text_content = fragment
+    for src, alt, width in images:
+        if src:
+            process_image_from_path(doc, src, alt, base_path, width)
+    for rows in tables:
+        build_table(doc, rows)
+    if text_content and not images and not tables:
+        doc.add_paragraph(text_content)
+
+def process_html_content_with_soup(doc, html_content, base_path):
+    """
+    用BeautifulSoup处理不常见的HTML内容
+    """
     # 解析HTML内容
     try:
         soup = BeautifulSoup(html_content, 'html.parser')
-        print("html_content:",html_content)
         # 查找所有图片标签
         img_tags = soup.find_all('img')
         
@@ -158,11 +483,9 @@ def process_html_content(doc, lines, start_index, base_path):
             doc.add_paragraph(text_content)
             
     except Exception as e:
-        print(f"解析HTML内容时出错: {e}")
+        logger.warning("解析HTML内容时出错: %s", e)
         # 如果解析失败，作为普通文本处理
         doc.add_paragraph(html_content.strip())
-    
-    return i
 
 def process_html_table(doc, table_soup):
     """
@@ -173,28 +496,18 @@ def process_html_table(doc, table_soup):
         if not rows:
             return
         
-        # 计算最大列数
-        max_cols = 0
+        # 单元格保留colspan/rowspan，交给build_table生成合并单元格
+        table_rows = []
         for row in rows:
-            cols = len(row.find_all(['td', 'th']))
-            max_cols = max(max_cols, cols)
-        
-        if max_cols == 0:
-            return
+            table_rows.append([(cell.get_text().strip(),
+                                _span_value(cell.get('colspan')),
+                                _span_value(cell.get('rowspan')))
+                               for cell in row.find_all(['td', 'th'])])
         
-        # 创建Word表格
-        table = doc.add_table(rows=len(rows), cols=max_cols)
-        table.style = 'Table Grid'
-        
-        # 填充表格数据
-        for row_idx, row in enumerate(rows):
-            cells = row.find_all(['td', 'th'])
-            for col_idx, cell in enumerate(cells):
-                if col_idx < max_cols:
-                    table.cell(row_idx, col_idx).text = cell.get_text().strip()
+        build_table(doc, table_rows)
                     
     except Exception as e:
-        print(f"处理HTML表格时出错: {e}")
+        logger.warning("处理HTML表格时出错: %s", e)
 
 def process_image_from_path(doc, img_path, alt_text, base_path, width_attr=None):
     """
@@ -215,33 +528,32 @@ def process_image_from_path(doc, img_path, alt_text, base_path, width_attr=None)
             
             # 获取图片尺寸并调整
             try:
-                with Image.open(full_img_path) as img:
-                    width, height = img.size
-                    
-                    # 处理width属性（如果有的话）
-                    if width_attr:
-                        if width_attr.endswith('%'):
-                            # 百分比宽度，转换为英寸（假设页面宽度为6.5英寸）
-                            percent = float(width_attr.rstrip('%')) / 100
-                            new_width = Inches(6.5 * percent)
-                        else:
-                            # 像素宽度，转换为英寸
-                            new_width = Inches(float(width_attr) / 100)
+                width, height = get_image_size(full_img_path)
+                
+                # 处理width属性（如果有的话）
+                if width_attr:
+                    if width_attr.endswith('%'):
+                        # 百分比宽度，转换为英寸（假设页面宽度为6.5英寸）
+                        percent = float(width_attr.rstrip('%')) / 100
+                        new_width = Inches(6.5 * percent)
                     else:
-                        # 默认处理：设置最大宽度为6英寸
-                        max_width = Inches(6)
-                        if width > height:
-                            new_width = min(max_width, Inches(width/100))
-                        else:
-                            new_height = min(Inches(4), Inches(height/100))
-                            new_width = Inches(width * new_height.inches / (height/100))
-                    
-                    # 计算对应的高度
-                    aspect_ratio = height / width
-                    new_height = Inches(new_width.inches * aspect_ratio)
+                        # 像素宽度，转换为英寸
+                        new_width = Inches(float(width_attr) / 100)
+                else:
+                    # 默认处理：设置最大宽度为6英寸
+                    max_width = Inches(6)
+                    if width > height:
+                        new_width = min(max_width, Inches(width/100))
+                    else:
+                        new_height = min(Inches(4), Inches(height/100))
+                        new_width = Inches(width * new_height.inches / (height/100))
+                
+                # 计算对应的高度
+                aspect_ratio = height / width
+                new_height = Inches(new_width.inches * aspect_ratio)
                 
                 run = paragraph.add_run()
-                run.add_picture(str(full_img_path), width=new_width, height=new_height)
+                run.add_picture(prepare_image(full_img_path, new_width.inches), width=new_width, height=new_height)
                 
                 # 添加图片说明
                 if alt_text and alt_text.lower() != 'image':
@@ -252,17 +564,91 @@ def process_image_from_path(doc, img_path, alt_text, base_path, width_attr=None)
                     caption_run.font.italic = True
                     
             except Exception as e:
-                print(f"处理图片时出错 {full_img_path}: {e}")
+                logger.warning("处理图片时出错 %s: %s", full_img_path, e)
                 # 如果图片处理失败，添加文本说明
                 doc.add_paragraph(f"[图片: {alt_text or img_path}]")
         else:
-            print(f"图片文件不存在: {full_img_path}")
+            logger.warning("图片文件不存在: %s", full_img_path)
             doc.add_paragraph(f"[图片不存在: {alt_text or img_path}]")
             
     except Exception as e:
-        print(f"处理图片时出错: {e}")
+        logger.warning("处理图片时出错: %s", e)
         doc.add_paragraph(f"[图片处理错误: {alt_text or img_path}]")
 
+@lru_cache(maxsize=4096)
+def _read_image_header(path, mtime_ns):
+    # Image.open只解析文件头，不解码像素
+    with Image.open(path) as img:
+        return img.size, img.format
+
+def get_image_size(path):
+    """读取图片尺寸，按路径和修改时间缓存"""
+    path = str(path)
+    return _read_image_header(path, os.stat(path).st_mtime_ns)[0]
+
+@lru_cache(maxsize=4096)
+def _file_digest(path, mtime_ns):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+# (内容摘要, 目标像素宽度) -> 缩放后的图片数据，内容相同的图片只处理一次
+# 多个线程可能同时转换（如paddle_ocr_web的任务线程），读写都要持有锁
+_prepared_images = OrderedDict()
+_prepared_images_lock = threading.Lock()
+
+def prepare_image(path, width_inches):
+    """
+    按目标DPI准备要嵌入的图片
+    
+    图片宽度超过 width_inches * IMAGE_TARGET_DPI 时缩放并重新压缩，
+    否则直接使用原文件。输出是确定的，python-docx会按内容SHA1
+    去重，重复出现的图片在docx中只保存一份。
+    
+    Returns:
+        str | io.BytesIO: 可直接传给 run.add_picture 的图片
+    """
+    path = str(path)
+    mtime_ns = os.stat(path).st_mtime_ns
+    (width, height), image_format = _read_image_header(path, mtime_ns)
+    target_px = max(1, math.ceil(width_inches * IMAGE_TARGET_DPI))
+
+    if width <= target_px and image_format in DOCX_IMAGE_FORMATS:
+        return path
+
+    key = (_file_digest(path, mtime_ns), min(width, target_px))
+    with _prepared_images_lock:
+        data = _prepared_images.get(key)
+        if data is not None:
+            _prepared_images.move_to_end(key)
+    if data is None:
+        # 缩放在锁外进行，不同图片可以并行处理
+        data = _encode_scaled_image(path, key[1])
+        with _prepared_images_lock:
+            _prepared_images[key] = data
+            while len(_prepared_images) > IMAGE_CACHE_SIZE:
+                _prepared_images.popitem(last=False)
+        logger.debug("图片已缩放: %s %dpx -> %dpx, %d bytes", path, width, key[1], len(data))
+    return io.BytesIO(data)
+
+def _encode_scaled_image(path, target_px):
+    """缩放到指定宽度并压缩：JPEG保持JPEG，其他格式输出PNG"""
+    with Image.open(path) as img:
+        source_format = img.format
+        if img.width > target_px:
+            target_height = max(1, round(img.height * target_px / img.width))
+            img.draft('RGB', (target_px, target_height))  # JPEG可在解码时直接降采样
+            img = img.resize((target_px, target_height), Image.LANCZOS)
+        buffer = io.BytesIO()
+        if source_format == 'JPEG':
+            if img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+            img.save(buffer, format='JPEG', quality=IMAGE_JPEG_QUALITY, optimize=True)
+        else:
+            if img.mode not in ('RGB', 'RGBA', 'L', 'LA', 'P'):
+                img = img.convert('RGBA')
+            img.save(buffer, format='PNG', optimize=True)
+        return buffer.getvalue()
+
 def process_markdown_image_line(doc, line, base_path):
     """
     处理Markdown格式的图片行
@@ -283,16 +669,13 @@ def setup_document_styles(doc):
         normal_style.font.name = '微软雅黑'
         normal_style.font.size = Pt(11)
 
-def process_code_block(doc, lines, start_index):
+def process_heading(doc, level, title_text):
+    """处理标题"""
+    heading = doc.add_heading(title_text, level=level)
+    heading.alignment = WD_ALIGN_PARAGRAPH.LEFT
+
+def process_code_block(doc, code_lines):
     """处理代码块"""
-    i = start_index + 1
-    code_lines = []
-    
-    # 收集代码块内容
-    while i < len(lines) and not lines[i].startswith('```'):
-        code_lines.append(lines[i])
-        i += 1
-    
     # 添加代码块到文档
     if code_lines:
         code_text = '\n'.join(code_lines)
@@ -302,68 +685,128 @@ def process_code_block(doc, lines, start_index):
         run.font.size = Pt(9)
         # 设置代码块样式
         para.style = doc.styles['Normal']
-    
-    return i
 
-def process_table(doc, lines, start_index):
+def process_table(doc, rows):
     """处理表格"""
-    table_lines = []
-    i = start_index
-    
-    # 收集表格行
-    while i < len(lines) and '|' in lines[i]:
-        line = lines[i].strip()
-        if line and not re.match(r'^\|?\s*:?-+:?\s*\|', line):  # 跳过分隔行
-            table_lines.append(line)
-        i += 1
-    
-    if len(table_lines) >= 1:
-        # 解析表格数据
-        rows = []
-        for line in table_lines:
-            cells = [cell.strip() for cell in line.split('|')]
-            # 移除首尾空元素
-            if cells and not cells[0]:
-                cells = cells[1:]
-            if cells and not cells[-1]:
-                cells = cells[:-1]
-            if cells:
-                rows.append(cells)
-        
-        if rows:
-            # 创建表格
-            max_cols = max(len(row) for row in rows)
-            table = doc.add_table(rows=len(rows), cols=max_cols)
-            table.style = 'Table Grid'
-            
-            # 填充表格数据
-            for row_idx, row_data in enumerate(rows):
-                for col_idx, cell_data in enumerate(row_data):
-                    if col_idx < max_cols:
-                        table.cell(row_idx, col_idx).text = cell_data
+    if rows:
+        build_table(doc, rows)
+
+# XML中不允许出现的控制字符
+INVALID_XML_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+def _span_value(value):
+    """解析colspan/rowspan属性，非法值按1处理"""
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return 1
+
+def layout_table(rows):
+    """
+    把带合并信息的行排布到网格上
+    
+    Args:
+        rows (list): 每行是单元格列表，单元格为文本或 (文本, colspan, rowspan)
     
-    return i - 1
+    Returns:
+        tuple: (网格行列表, 列数)。每个网格行是 [(文本, colspan, vmerge)]，
+        vmerge为 None / 'restart' / 'continue'，行末已用空单元格补齐
+    """
+    grid = []
+    pending = {}  # 起始列 -> [剩余行数, colspan]，记录上方单元格的rowspan
+    max_cols = 0
 
-def process_list(doc, lines, start_index):
-    """处理列表"""
-    i = start_index
-    list_items = []
+    for row in rows:
+        slots = []
+        col = 0
+
+        def fill_merged(until=None):
+            # 输出被上方rowspan占用的列，until为None时只处理当前列
+            nonlocal col
+            while True:
+                if col in pending:
+                    remaining, colspan = pending[col]
+                    slots.append(('', colspan, 'continue'))
+                    if remaining == 1:
+                        del pending[col]
+                    else:
+                        pending[col] = [remaining - 1, colspan]
+                    col += colspan
+                elif until is not None and any(c >= col for c in pending):
+                    slots.append(('', 1, None))
+                    col += 1
+                else:
+                    return
+
+        for cell in row:
+            text, colspan, rowspan = (cell, 1, 1) if isinstance(cell, str) else cell
+            fill_merged()
+            slots.append((text, colspan, 'restart' if rowspan > 1 else None))
+            if rowspan > 1:
+                pending[col] = [rowspan - 1, colspan]
+            col += colspan
+        fill_merged(until=True)
+
+        grid.append((slots, col))
+        max_cols = max(max_cols, col)
+
+    # 行末补齐空单元格，保证每行覆盖全部网格列
+    return [slots + [('', 1, None)] * (max_cols - width) for slots, width in grid], max_cols
+
+def _cell_xml(text, colspan, vmerge, col_width):
+    tc_pr = f'<w:tcW w:type="dxa" w:w="{col_width * colspan}"/>'
+    if colspan > 1:
+        tc_pr += f'<w:gridSpan w:val="{colspan}"/>'
+    if vmerge == 'restart':
+        tc_pr += '<w:vMerge w:val="restart"/>'
+    elif vmerge == 'continue':
+        tc_pr += '<w:vMerge/>'
+    text = INVALID_XML_CHARS.sub('', text)
+    if not text:
+        return f'<w:tc><w:tcPr>{tc_pr}</w:tcPr><w:p/></w:tc>'
+    # 与 run.text 一致：换行转为w:br，制表符转为w:tab
+    content = (escape(text)
+               .replace('\n', '</w:t><w:br/><w:t xml:space="preserve">')
+               .replace('\t', '</w:t><w:tab/><w:t xml:space="preserve">'))
+    return (f'<w:tc><w:tcPr>{tc_pr}</w:tcPr><w:p><w:r>'
+            f'<w:t xml:space="preserve">{content}</w:t></w:r></w:p></w:tc>')
+
+def build_table(doc, rows, style='Table Grid'):
+    """
+    批量构建表格
     
-    # 收集列表项
-    while i < len(lines):
-        line = lines[i].strip()
-        if not line:
-            i += 1
-            continue
-        
-        if line.startswith(('- ', '* ', '+ ')):
-            list_items.append(('bullet', line[2:].strip()))
-        elif re.match(r'^\d+\. ', line):
-            list_items.append(('number', re.sub(r'^\d+\. ', '', line).strip()))
-        else:
-            break
-        i += 1
+    table.cell(r, c) 每次调用都要遍历整张表的XML，大表逐格赋值是平方级的。
+    这里一次性拼出所有 w:tr 的XML并整体解析后挂到表格上，支持colspan（gridSpan）
+    和rowspan（vMerge）。
     
+    Args:
+        doc: python-docx文档
+        rows (list): 每行是单元格列表，单元格为文本或 (文本, colspan, rowspan)
+        style (str): 表格样式
+    
+    Returns:
+        Table: 生成的表格，没有单元格时返回None
+    """
+    grid, max_cols = layout_table(rows)
+    if max_cols == 0:
+        return None
+
+    table = doc.add_table(rows=0, cols=max_cols)
+    table.style = style
+    col_width = table._tbl.tblGrid.gridCol_lst[0].w.twips
+
+    rows_xml = ''.join(
+        '<w:tr>' + ''.join(_cell_xml(text, colspan, vmerge, col_width)
+                           for text, colspan, vmerge in slots) + '</w:tr>'
+        for slots in grid
+    )
+    fragment = parse_xml(f'<w:tbl {nsdecls("w")}>{rows_xml}</w:tbl>')
+    for tr in list(fragment):
+        table._tbl.append(tr)
+    return table
+
+def process_list(doc, list_items):
+    """处理列表"""
     # 添加列表到文档
     for list_type, item_text in list_items:
         para = doc.add_paragraph()
@@ -372,8 +815,6 @@ def process_list(doc, lines, start_index):
         else:
             para.style = 'List Number'
         para.add_run(item_text)
-    
-    return i - 1
 
 def process_quote(doc, line):
     """处理引用"""
@@ -391,36 +832,288 @@ def process_paragraph(doc, line):
         para = doc.add_paragraph()
         process_inline_formatting(para, line)
 
+# 行内片段：style为 None / 'bold' / 'italic' / 'code' / 'link'，链接的地址放在url中
+InlineSpan = namedtuple('InlineSpan', ['text', 'style', 'url'])
+
+INLINE_SPECIAL = re.compile(r'[\\*`\[]')
+ESCAPABLE_CHARS = set('\\`*_{}[]()#+-.!|<>~')
+
+def tokenize_inline(text):
+    """
+    从左到右单遍扫描行内格式：**粗体**、*斜体*、`代码`、[链接](地址)和反斜杠转义
+    
+    相邻的普通文本合并为一个片段，空片段直接丢弃。找不到闭合标记时按普通文本处理，
+    并记住该标记在后文中不存在，保证整体是线性时间。
+    
+    Returns:
+        list: InlineSpan列表
+    """
+    spans = []
+    plain = []
+    missing = set()  # 后文中已确认不存在的闭合标记
+    
+    def flush_plain():
+        if plain:
+            spans.append(InlineSpan(''.join(plain), None, None))
+            plain.clear()
+    
+    def find_closer(marker, start):
+        if marker in missing:
+            return -1
+        end = text.find(marker, start)
+        if end < 0:
+            missing.add(marker)
+        return end
+    
+    i = 0
+    length = len(text)
+    while i < length:
+        match = INLINE_SPECIAL.search(text, i)
+        if match is None:
+            plain.append(text[i:])
+            break
+        pos = match.start()
+        if pos > i:
+            plain.append(text[i:pos])
+        char = text[pos]
+        
+        if char == '\\':
+            # 转义字符按字面输出
+            if pos + 1 < length and text[pos + 1] in ESCAPABLE_CHARS:
+                plain.append(text[pos + 1])
+                i = pos + 2
+            else:
+                plain.append(char)
+                i = pos + 1
+        
+        elif char == '`':
+            end = find_closer('`', pos + 1)
+            if end < 0:
+                plain.append(char)
+                i = pos + 1
+            else:
+                flush_plain()
+                if end > pos + 1:
+                    spans.append(InlineSpan(text[pos + 1:end], 'code', None))
+                i = end + 1
+        
+        elif char == '*':
+            marker, style = ('**', 'bold') if text.startswith('**', pos) else ('*', 'italic')
+            start = pos + len(marker)
+            end = find_closer(marker, start)
+            if end < 0:
+                plain.append(marker)
+                i = start
+            else:
+                flush_plain()
+                content = _unescape_inline(text[start:end])
+                if content:
+                    spans.append(InlineSpan(content, style, None))
+                i = end + len(marker)
+        
+        else:  # '['
+            text_end = find_closer(']', pos + 1)
+            url_end = find_closer(')', text_end + 2) if text_end >= 0 and text.startswith('(', text_end + 1) else -1
+            if url_end < 0:
+                plain.append(char)
+                i = pos + 1
+            else:
+                flush_plain()
+                link_text = _unescape_inline(text[pos + 1:text_end])
+                url = text[text_end + 2:url_end].strip()
+                spans.append(InlineSpan(link_text or url, 'link', url))
+                i = url_end + 1
+    
+    flush_plain()
+    return spans
+
+def _unescape_inline(text):
+    if '\\' not in text:
+        return text
+    return re.sub(r'\\([\\`*_{}\[\]()#+\-.!|<>~])', r'\1', text)
+
 def process_inline_formatting(paragraph, text):
-    """处理内联格式（粗体、斜体等）"""
-    # 简单的内联格式处理
-    parts = re.split(r'(\*\*.*?\*\*|\*.*?\*|`.*?`)', text)
-    
-    for part in parts:
-        if part.startswith('**') and part.endswith('**'):
-            # 粗体
-            run = paragraph.add_run(part[2:-2])
+    """处理内联格式（粗体、斜体、代码、链接）"""
+    for span in tokenize_inline(text):
+        if span.style == 'bold':
+            run = paragraph.add_run(span.text)
             run.bold = True
-        elif part.startswith('*') and part.endswith('*') and not part.startswith('**'):
-            # 斜体
-            run = paragraph.add_run(part[1:-1])
+        elif span.style == 'italic':
+            run = paragraph.add_run(span.text)
             run.italic = True
-        elif part.startswith('`') and part.endswith('`'):
-            # 代码
-            run = paragraph.add_run(part[1:-1])
+        elif span.style == 'code':
+            run = paragraph.add_run(span.text)
             run.font.name = 'Consolas'
             run.font.size = Pt(10)
+        elif span.style == 'link':
+            add_hyperlink(paragraph, span.text, span.url)
         else:
-            # 普通文本
-            paragraph.add_run(part)
+            paragraph.add_run(span.text)
 
-# 使用示例
-if __name__ == "__main__":
-    # 示例用法
-    markdown_file = "output/北邮~结构图测试2.md"  # 替换为您的markdown文件路径
+def add_hyperlink(paragraph, text, url):
+    """添加外部超链接：w:hyperlink 引用一个 External 关系"""
+    r_id = paragraph.part.relate_to(url, RT.HYPERLINK, is_external=True)
+    hyperlink = OxmlElement('w:hyperlink')
+    hyperlink.set(qn('r:id'), r_id)
+    run = paragraph.add_run(text)
+    run.font.color.rgb = RGBColor(0x05, 0x63, 0xC1)
+    run.font.underline = True
+    # 把run移入w:hyperlink
+    hyperlink.append(run._r)
+    paragraph._p.append(hyperlink)
+    return hyperlink
+
+IMAGE_REFERENCE_PATTERN = re.compile(r'!\[[^\]]*\]\(([^\)]+)\)|<img[^>]*?src=["\']([^"\']+)["\']')
+
+def find_markdown_files(inputs, output_dir=None):
+    """
+    展开目录和通配符，返回 [(markdown文件, 输出目录)]
     
+    指定output_dir时，目录输入下的文件保持相对子目录结构，通配符输入下的文件保持
+    相对于通配符中不含通配部分的前缀目录的结构，避免同名文件互相覆盖；
+    否则docx生成在markdown文件旁边。
+    """
+    found = {}
+    for item in inputs:
+        if os.path.isdir(item):
+            root = Path(item)
+            for md_path in root.rglob('*.md'):
+                out = Path(output_dir) / md_path.parent.relative_to(root) if output_dir else md_path.parent
+                found.setdefault(md_path.resolve(), out)
+        else:
+            matches = glob.glob(item, recursive=True) if glob.has_magic(item) else [item]
+            if not matches:
+                logger.warning("没有匹配的文件: %s", item)
+            root = _glob_root(item)
+            for match in matches:
+                md_path = Path(match)
+                if md_path.is_file():
+                    out = Path(output_dir) / md_path.parent.relative_to(root) if output_dir else md_path.parent
+                    found.setdefault(md_path.resolve(), out)
+    return sorted(found.items())
+
+def _glob_root(pattern):
+    # 通配符之前的目录部分，如 "output/**/*.md" -> "output"；普通文件路径取其所在目录
+    path = Path(pattern)
+    if not glob.has_magic(pattern):
+        return path.parent
+    root = []
+    for part in path.parts:
+        if glob.has_magic(part):
+            break
+        root.append(part)
+    return Path(*root) if root else Path('.')
+
+def referenced_images(md_path):
+    """返回markdown中引用的本地图片路径"""
+    with open(md_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    images = []
+    for md_src, html_src in IMAGE_REFERENCE_PATTERN.findall(content):
+        src = (md_src or html_src).strip()
+        images.append(Path(src) if os.path.isabs(src) else md_path.parent / src)
+    return images
+
+def is_up_to_date(md_path, docx_path):
+    """docx比markdown及其引用的图片都新时返回True"""
+    if not docx_path.exists():
+        return False
+    docx_mtime = docx_path.stat().st_mtime_ns
+    if md_path.stat().st_mtime_ns > docx_mtime:
+        return False
+    for img_path in referenced_images(md_path):
+        if img_path.exists() and img_path.stat().st_mtime_ns > docx_mtime:
+            return False
+    return True
+
+def _convert_one(md_path, output_dir):
+    # 在工作进程中执行，异常以字符串返回，避免不可序列化的异常对象
+    start = time.perf_counter()
     try:
-        docx_path = markdown_to_docx_with_images(markdown_file)
-        print(f"转换成功！生成的Word文档: {docx_path}")
+        docx_path = markdown_to_docx_with_images(md_path, output_dir)
+        return docx_path, time.perf_counter() - start, None
     except Exception as e:
-        print(f"转换失败: {e}")
+        return None, time.perf_counter() - start, f"{type(e).__name__}: {e}"
+
+def batch_convert(inputs, output_dir=None, workers=None, force=False):
+    """
+    批量转换markdown文件为docx
+    
+    Args:
+        inputs (list): markdown文件、目录或通配符
+        output_dir (str, optional): 输出目录，默认与markdown文件相同
+        workers (int, optional): 进程数，默认为CPU核数
+        force (bool): 为True时不跳过已是最新的文件
+    
+    Returns:
+        dict: 转换统计（converted/skipped/failed/elapsed等）
+    """
+    start = time.perf_counter()
+    tasks = []
+    skipped = 0
+    failures = []
+    targets = {}
+    for md_path, out_dir in find_markdown_files(inputs, output_dir):
+        targets.setdefault((out_dir / f"{md_path.stem}.docx").resolve(), []).append((md_path, out_dir))
+    for docx_path, sources in targets.items():
+        # 多个文件输出到同一个docx（如指定了多个同名文件），全部记为失败，避免互相覆盖
+        if len(sources) > 1:
+            for md_path, _ in sources:
+                failures.append((str(md_path), f"输出文件重名: {docx_path}"))
+                logger.error("输出文件重名 %s: %s", docx_path, md_path)
+            continue
+        md_path, out_dir = sources[0]
+        if not force and is_up_to_date(md_path, docx_path):
+            skipped += 1
+            continue
+        tasks.append((md_path, out_dir))
+    duplicated = len(failures)
+    
+    converted = 0
+    input_bytes = 0
+    if tasks:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_convert_one, str(md_path), str(out_dir)): md_path
+                       for md_path, out_dir in tasks}
+            for done, future in enumerate(as_completed(futures), 1):
+                md_path = futures[future]
+                docx_path, elapsed, error = future.result()
+                if error:
+                    failures.append((str(md_path), error))
+                    logger.error("[%d/%d] 转换失败 %s: %s", done, len(tasks), md_path, error)
+                else:
+                    converted += 1
+                    input_bytes += md_path.stat().st_size
+                    logger.info("[%d/%d] %s (%.2fs)", done, len(tasks), docx_path, elapsed)
+    
+    elapsed = time.perf_counter() - start
+    return {
+        "total": len(tasks) + skipped + duplicated,
+        "converted": converted,
+        "skipped": skipped,
+        "failed": len(failures),
+        "failures": failures,
+        "elapsed": elapsed,
+        "files_per_sec": converted / elapsed if elapsed else 0.0,
+        "mb_per_sec": input_bytes / 1024 / 1024 / elapsed if elapsed else 0.0,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='批量将markdown文件转换为docx')
+    parser.add_argument('inputs', nargs='+', help='markdown文件、目录或通配符（如 "output/**/*.md"）')
+    parser.add_argument('--output-dir', help='输出目录，默认与markdown文件相同')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='并行进程数')
+    parser.add_argument('--force', action='store_true', help='忽略已是最新的docx，全部重新转换')
+    parser.add_argument('--log-level', default='INFO')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(message)s")
+    summary = batch_convert(args.inputs, args.output_dir, args.workers, args.force)
+    
+    print(f"共 {summary['total']} 个文件：转换 {summary['converted']}，"
+          f"跳过 {summary['skipped']}，失败 {summary['failed']}")
+    print(f"耗时 {summary['elapsed']:.2f}s，{summary['files_per_sec']:.2f} 文件/秒，"
+          f"{summary['mb_per_sec']:.2f} MB/秒")
+    for md_path, error in summary['failures']:
+        print(f"  失败: {md_path}: {error}")
+    sys.exit(1 if summary['failed'] else 0)
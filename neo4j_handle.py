@@ -1,100 +1,481 @@
-from py2neo import Graph
-import pydot
 import re
-from common import neo4j_local_ip, neo4j_username, neo4j_password
-
-# 连接Neo4j
-graph = Graph(neo4j_local_ip, auth=(neo4j_username, neo4j_password))
+import io
+import os
+import csv
+import sys
+import json
+import time
+import glob
+import random
+import hashlib
+import threading
+import argparse
+import tempfile
+import contextlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from itertools import islice
 '''
     解析AST代码，把结构转换成neo4j的cypher命令，存储到知识图谱
 '''
 
-node_ids = set()
-node_id_names = {}
+# Neo4j连接，第一次使用时才创建
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_graph():
+    """
+    懒加载Neo4j连接，导入本模块不需要可用的数据库
+    """
+    global _graph
+    with _graph_lock:
+        if _graph is None:
+            from py2neo import Graph
+            from common import neo4j_local_ip, neo4j_username, neo4j_password
+            _graph = Graph(neo4j_local_ip, auth=(neo4j_username, neo4j_password))
+    return _graph
+
+# 每批UNWIND的行数，单独提交一次事务
+BATCH_SIZE = 5000
+
+CREATE_NODE_STATEMENT = "CREATE (:Entity {name: $name, type: $type})"
+CREATE_EDGE_STATEMENT = "MATCH (a:Entity {name: $parent}), (b:Entity {name: $child}) CREATE (a)-[:HAS_FEATURE]->(b)"
 
+# 批量导入语句：name唯一约束同时提供索引，MATCH不再全表扫描
+# 同名节点和关系由多个DOT文件共享，sources记录声明了它们的文件，增量同步时按来源删除
+CONSTRAINT_STATEMENT = "CREATE CONSTRAINT entity_name_unique IF NOT EXISTS FOR (n:Entity) REQUIRE n.name IS UNIQUE"
+MERGE_NODES_STATEMENT = """
+UNWIND $rows AS row
+MERGE (n:Entity {name: row.name})
+ON CREATE SET n.type = row.type
+SET n.sources = coalesce(n.sources, []) + [source IN row.sources WHERE NOT source IN coalesce(n.sources, [])]
+"""
+MERGE_EDGES_STATEMENT = """
+UNWIND $rows AS row
+MATCH (a:Entity {name: row.parent})
+MATCH (b:Entity {name: row.child})
+MERGE (a)-[r:HAS_FEATURE]->(b)
+SET r.sources = coalesce(r.sources, []) + [source IN row.sources WHERE NOT source IN coalesce(r.sources, [])]
+"""
 
+# 增量同步语句
+SET_NODE_TYPES_STATEMENT = """
+UNWIND $rows AS row
+MATCH (n:Entity {name: row.name})
+SET n.type = row.type
+"""
+# 去掉本文件的来源，没有其他文件声明的关系才删除
+REMOVE_EDGE_SOURCE_STATEMENT = """
+UNWIND $rows AS row
+MATCH (a:Entity {name: row.parent})-[r:HAS_FEATURE]->(b:Entity {name: row.child})
+SET r.sources = [source IN coalesce(r.sources, []) WHERE source <> row.source]
+WITH r
+WHERE size(r.sources) = 0
+DELETE r
+"""
+# 去掉本文件的来源，没有其他文件声明、也没有任何关系的节点才删除
+REMOVE_NODE_SOURCE_STATEMENT = """
+UNWIND $rows AS row
+MATCH (n:Entity {name: row.name})
+SET n.sources = [source IN coalesce(n.sources, []) WHERE source <> row.source]
+WITH n
+WHERE size(n.sources) = 0 AND NOT (n)--()
+DELETE n
+"""
+
+
+CHAPTER_NUMBER_PATTERN = re.compile(r'[0-9一二三四五六七八九十.]+ s*')
+LABEL_SPLIT_PATTERN = re.compile(r'[\|{}]')
+
+
+@lru_cache(maxsize=65536)
 def clean_chapter_number(text):
     text = text.replace('"', '')
-    return re.sub(r'[0-9一二三四五六七八九十.]+ s*', '', text)
-
-
-def get_command_by_node(graphs, cypher_commands):
-    nodes_in_graph = graphs.get_nodes()
-    for graph in nodes_in_graph:
-        # 节点的名称是其唯一标识符
-        node_id = graph.get_name()
-        # 节点的标签通常是其显示文本
-        node_label = graph.get_label()
-        if node_label is not None:
-            # 解析复合标签结构
-            main_node, *sub_nodes = re.split(r'[\|{}]', node_label)
-            sub_nodes = [s.strip() for s in sub_nodes if len(s.strip()) >= 2]
-            main_node = main_node.strip()
-            node_name = create_neo4j_node(main_node, sub_nodes, cypher_commands)
-            node_id_names[node_id] = node_name
-            node_ids.add(node_name)
-    all_edges = graphs.get_edges()
-    for i, edge in enumerate(all_edges):
-        parent_id = edge.get_source()
-        destination = edge.get_destination()
-        if type(destination) != str:
-            child_ids = list(destination["nodes"].keys())
-        else:
-            continue
-        if parent_id in node_id_names:
-            parent_name = node_id_names[parent_id]
-        else:
-            print(parent_id)
+    return CHAPTER_NUMBER_PATTERN.sub('', text)
+
+
+DOT_READ_SIZE = 1 << 16
+# 注释、引号字符串（含转义）、边运算符、标点和ID；引号字符串保留原样，与pydot的get_name/get_label一致
+DOT_TOKEN_PATTERN = re.compile(r"""
+    (?P<skip>\s+|//[^\n]*|\#[^\n]*|/\*.*?\*/)
+  | (?P<string>"(?:[^"\\]|\\.)*")
+  | (?P<edgeop>->|--)
+  | (?P<punct>[{}\[\];,=:+])
+  | (?P<id>-?[\w.]+)
+""", re.VERBOSE | re.DOTALL)
+
+
+def iter_dot_tokens(f):
+    """
+    从文件对象分块读取DOT文本并逐个产生token，不把整个文件读入内存
+    """
+    buffer = ''
+    eof = False
+    pos = 0
+    while True:
+        if not eof and len(buffer) - pos < DOT_READ_SIZE:
+            chunk = f.read(DOT_READ_SIZE)
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            eof = not chunk
+        if pos >= len(buffer):
+            return
+        if buffer[pos] == '<':
+            # HTML标签值 <...>，允许嵌套
+            depth = 0
+            for end in range(pos, len(buffer)):
+                depth += {'<': 1, '>': -1}.get(buffer[end], 0)
+                if depth == 0:
+                    break
+            if depth != 0:
+                if eof:
+                    raise ValueError('DOT文件中存在未闭合的<...>')
+                buffer = buffer[pos:] + f.read(DOT_READ_SIZE)
+                pos = 0
+                continue
+            yield buffer[pos:end + 1]
+            pos = end + 1
             continue
-        child_names = []
-        for child_id in child_ids:
-            child_name = node_id_names[child_id]
-            child_names.append(child_name)
-        if len(child_names) > 0:
-            create_neo4j_node(parent_name, child_names, cypher_commands)
-
-
-def create_neo4j_node(main_node, sub_nodes, cypher_commands):
-    # 创建主节点
-    node_name = clean_chapter_number(main_node)
-    if node_name not in node_ids:
-        node_ids.add(node_name)
-        cypher_commands.append({
-            'statement': "CREATE (:Entity {name: $name, type: $type})",
-            'parameters': {'name': node_name, 'type': 'ChapterSection'}
-        })
-    print(main_node, sub_nodes)
-    # 创建子节点及关系
-    for sub_node in filter(None, [s.strip() for s in sub_nodes]):
-        sub_name = clean_chapter_number(sub_node)
-        if sub_name not in node_ids:
-            node_ids.add(sub_name)
-            cypher_commands.append({
-                'statement': "CREATE (:Entity {name: $name, type: $type})",
-                'parameters': {'name': sub_name, 'type': 'Feature'}
-            })
-        cypher_commands.append({
-            'statement': "MATCH (a:Entity {name: $parent}), (b:Entity {name: $child}) CREATE (a)-[:HAS_FEATURE]->(b)",
-            'parameters': {'parent': node_name, 'child': sub_name}
-        })
-    return node_name
+        match = DOT_TOKEN_PATTERN.match(buffer, pos)
+        # token可能被分块截断：碰到缓冲区末尾时先读入更多内容再匹配
+        if (match is None or match.end() == len(buffer)) and not eof:
+            more = f.read(DOT_READ_SIZE)
+            if more:
+                buffer = buffer[pos:] + more
+                pos = 0
+                continue
+            eof = True
+        if match is None:
+            raise ValueError(f'无法解析的DOT内容: {buffer[pos:pos + 40]!r}')
+        pos = match.end()
+        if match.lastgroup != 'skip':
+            yield match.group()
 
 
-def dot_to_cypher(dot_data):
+class DotReader:
     """
-    DOT转Cypher核心逻辑
+    流式DOT解析器，只支持我们生成的AST文件用到的子集：
+    带record标签的节点、边、子图以及 a -> {b c} 形式的边目标。
+
+    iter_events() 依次产生：
+        ('node', 节点ID, 标签或None)
+        ('edge', 起点ID, [终点ID...])  仅限终点为 {...} 的边，与原先基于pydot的处理一致
+    """
+
+    def __init__(self, f):
+        self._tokens = iter_dot_tokens(f)
+        self._lookahead = None
+
+    def _next(self):
+        if self._lookahead is not None:
+            token, self._lookahead = self._lookahead, None
+            return token
+        return next(self._tokens, None)
+
+    def _peek(self):
+        if self._lookahead is None:
+            self._lookahead = next(self._tokens, None)
+        return self._lookahead
+
+    def _expect(self, expected):
+        token = self._next()
+        if token != expected:
+            raise ValueError(f'DOT语法错误: 期望 {expected!r}，实际 {token!r}')
+
+    def iter_events(self):
+        token = self._next()
+        if token == 'strict':
+            token = self._next()
+        if token not in ('graph', 'digraph'):
+            raise ValueError(f'DOT语法错误: 期望 graph/digraph，实际 {token!r}')
+        if self._peek() != '{':
+            self._next()  # 图名称
+        self._expect('{')
+        yield from self._stmt_list()
+
+    def _attr_list(self):
+        # [a=b, c=d][e=f]，属性值保留原样
+        attrs = {}
+        while self._peek() == '[':
+            self._next()
+            while True:
+                token = self._next()
+                if token is None:
+                    raise ValueError('DOT语法错误: 属性列表未闭合')
+                if token == ']':
+                    break
+                if token in (',', ';'):
+                    continue
+                if self._peek() == '=':
+                    self._next()
+                    attrs[token] = self._value()
+                else:
+                    attrs[token] = 'true'
+        return attrs
+
+    def _value(self):
+        value = self._next()
+        # "a" + "b" 形式的字符串拼接
+        while self._peek() == '+':
+            self._next()
+            value = value[:-1] + self._next()[1:]
+        return value
+
+    def _node_id(self, token):
+        # 忽略端口 a:port:compass
+        while self._peek() == ':':
+            self._next()
+            self._next()
+        return token
+
+    def _subgraph(self, opened=False):
+        """解析子图并产生其中的事件，返回子图中出现的节点ID；opened表示 { 已被读取"""
+        if not opened:
+            if self._peek() != '{':
+                self._next()  # 子图名称
+            self._expect('{')
+        members = []
+        yield from self._stmt_list(members)
+        return members
+
+    def _stmt_list(self, members=None):
+        while True:
+            token = self._next()
+            if token is None:
+                raise ValueError('DOT语法错误: 缺少 }')
+            if token == '}':
+                return
+            if token in (';', ','):
+                continue
+
+            if token in ('graph', 'node', 'edge') and self._peek() == '[':
+                self._attr_list()
+                continue
+            if self._peek() == '=':
+                # 图属性 a = b
+                self._next()
+                self._value()
+                continue
+
+            # 边的第一个端点：节点ID或子图
+            if token in ('subgraph', '{'):
+                operand = yield from self._subgraph(opened=token == '{')
+            else:
+                operand = self._node_id(token)
+
+            if self._peek() not in ('->', '--'):
+                if isinstance(operand, str):
+                    attrs = self._attr_list()
+                    if members is not None:
+                        members.append(operand)
+                    yield ('node', operand, attrs.get('label'))
+                continue
+
+            while self._peek() in ('->', '--'):
+                self._next()
+                token = self._next()
+                if token in ('subgraph', '{'):
+                    target = yield from self._subgraph(opened=token == '{')
+                else:
+                    target = self._node_id(token)
+                if isinstance(operand, str) and not isinstance(target, str):
+                    yield ('edge', operand, target)
+                operand = target
+            self._attr_list()
+
+
+class KgRegistry:
+    """
+    单次导入的节点/关系登记表
+
+    名称intern后映射为整数ID，类型和关系存放在紧凑数组中，导入结束后
+    再按批生成参数行。每次导入各用一个实例，多个导入可以并发执行。
+
+    source为DOT文件的来源标识，写入每个节点和关系的sources；由merge汇总多个
+    文件的登记表（自身source为None）按节点和关系分别记录来源列表。
     """
-    (graphs,) = pydot.graph_from_dot_data(dot_data)
-    cypher_commands = []
 
-    # 递归处理所有子图和主图节点
-    get_command_by_node(graphs, cypher_commands)
-    # 生成关系CYPHER
-    # 递归处理所有子图和主图边
+    NODE_TYPES = ('ChapterSection', 'Feature')
+
+    def __init__(self, source=None):
+        self._name_ids = {}          # 名称 -> 整数ID
+        self.names = []              # 整数ID -> 名称
+        self.types = array('B')      # 整数ID -> NODE_TYPES下标
+        self.dot_ids = {}            # DOT节点ID -> 整数ID
+        self.parents = array('I')    # 关系起点
+        self.children = array('I')   # 关系终点
+        self.source = source
+        self.node_sources = {}       # merge得到的来源：整数ID -> 来源列表
+        self.edge_sources = {}       # merge得到的来源：起点<<32|终点 -> 来源列表
+
+    @property
+    def node_count(self):
+        return len(self.names)
+
+    @property
+    def edge_count(self):
+        return len(self.parents)
+
+    def entity(self, name, node_type):
+        """返回名称对应的整数ID，第一次出现时登记类型"""
+        entity_id = self._name_ids.get(name)
+        if entity_id is None:
+            entity_id = len(self.names)
+            name = sys.intern(name)
+            self._name_ids[name] = entity_id
+            self.names.append(name)
+            self.types.append(self.NODE_TYPES.index(node_type))
+        return entity_id
+
+    def link(self, main_node, sub_nodes):
+        """创建主节点、子节点及 主节点-[:HAS_FEATURE]->子节点 关系，返回主节点ID"""
+        parent = self.entity(clean_chapter_number(main_node), 'ChapterSection')
+        for sub_node in sub_nodes:
+            sub_node = sub_node.strip()
+            if sub_node:
+                self.parents.append(parent)
+                self.children.append(self.entity(clean_chapter_number(sub_node), 'Feature'))
+        return parent
+
+    def add_node(self, node_id, node_label):
+        # 节点的名称是其唯一标识符，标签通常是其显示文本
+        if node_label is None:
+            return
+        # 解析复合标签结构
+        main_node, *sub_nodes = LABEL_SPLIT_PATTERN.split(node_label)
+        sub_nodes = [s.strip() for s in sub_nodes if len(s.strip()) >= 2]
+        self.dot_ids[node_id] = self.link(main_node.strip(), sub_nodes)
+
+    def add_edge(self, parent_id, child_ids):
+        """
+        生成父节点到{...}中各子节点的关系；端点还未出现时返回False，由调用方推迟处理
+        """
+        if parent_id not in self.dot_ids or any(child_id not in self.dot_ids for child_id in child_ids):
+            return False
+        if child_ids:
+            self.link(self.names[self.dot_ids[parent_id]],
+                      [self.names[self.dot_ids[child_id]] for child_id in child_ids])
+        return True
+
+    def read_dot(self, f):
+        """
+        从DOT文件对象流式读取节点和边
+
+        节点和边按文件顺序处理；引用了尚未定义节点的边推迟到文件末尾再处理，
+        届时仍找不到的端点会被打印并跳过。
+        """
+        for _ in self.iter_read_dot(f):
+            pass
+        return self
+
+    def iter_read_dot(self, f):
+        """
+        read_dot的逐步版本：每处理完一条语句yield一次，调用方可以边解析边取出新登记的行
+        """
+        deferred_edges = []
+        for event in DotReader(f).iter_events():
+            if event[0] == 'node':
+                self.add_node(event[1], event[2])
+            elif not self.add_edge(event[1], event[2]):
+                deferred_edges.append(event)
+            yield
+
+        for _, parent_id, child_ids in deferred_edges:
+            if parent_id not in self.dot_ids:
+                print(parent_id)
+                continue
+            missing = [child_id for child_id in child_ids if child_id not in self.dot_ids]
+            if missing:
+                print(parent_id, missing)
+            self.add_edge(parent_id, [child_id for child_id in child_ids if child_id in self.dot_ids])
+            yield
+
+    def merge(self, other):
+        """
+        合并另一个登记表，同名节点去重（保留先出现的类型），关系按新ID重新编号，
+        节点和关系的来源取并集
+        """
+        mapping = array('I', (self.entity(name, other.NODE_TYPES[type_index])
+                              for name, type_index in zip(other.names, other.types)))
+        for other_id, entity_id in enumerate(mapping):
+            _add_sources(self.node_sources, entity_id, other.node_sources_of(other_id))
+        for parent, child in zip(other.parents, other.children):
+            new_parent, new_child = mapping[parent], mapping[child]
+            self.parents.append(new_parent)
+            self.children.append(new_child)
+            _add_sources(self.edge_sources, new_parent << 32 | new_child, other.edge_sources_of(parent, child))
+        return self
+
+    def node_sources_of(self, entity_id):
+        return self.node_sources.get(entity_id) or ([self.source] if self.source else [])
 
-    for node in graphs.get_subgraphs():
-        get_command_by_node(node, cypher_commands)
-    return cypher_commands
+    def edge_sources_of(self, parent, child):
+        return self.edge_sources.get(parent << 32 | child) or ([self.source] if self.source else [])
+
+    def dedupe_edges(self):
+        """
+        去掉重复的关系，保留第一次出现的顺序
+        """
+        seen = set()
+        parents = array('I')
+        children = array('I')
+        for parent, child in zip(self.parents, self.children):
+            key = parent << 32 | child
+            if key not in seen:
+                seen.add(key)
+                parents.append(parent)
+                children.append(child)
+        self.parents, self.children = parents, children
+        return self
+
+    def node_rows(self, start=0):
+        """逐个产生节点参数行 {name, type, sources}，从第start个节点开始"""
+        for index in range(start, len(self.names)):
+            yield {'name': self.names[index], 'type': self.NODE_TYPES[self.types[index]],
+                   'sources': self.node_sources_of(index)}
+
+    def edge_rows(self, start=0):
+        """逐个产生关系参数行 {parent, child, sources}，从第start条关系开始"""
+        names = self.names
+        for index in range(start, len(self.parents)):
+            parent, child = self.parents[index], self.children[index]
+            yield {'parent': names[parent], 'child': names[child], 'sources': self.edge_sources_of(parent, child)}
+
+    def snapshot(self):
+        """节点{name: type}和关系{(parent, child)}，用于增量同步的清单"""
+        nodes = {name: self.NODE_TYPES[type_index] for name, type_index in zip(self.names, self.types)}
+        edges = {(self.names[parent], self.names[child]) for parent, child in zip(self.parents, self.children)}
+        return nodes, edges
+
+    def cypher_commands(self):
+        """逐条的Cypher命令，兼容 import_kg_to_neo4j"""
+        commands = [{'statement': CREATE_NODE_STATEMENT, 'parameters': row} for row in self.node_rows()]
+        commands += [{'statement': CREATE_EDGE_STATEMENT, 'parameters': row} for row in self.edge_rows()]
+        return commands
+
+
+def _add_sources(table, key, sources):
+    current = table.setdefault(key, [])
+    for source in sources:
+        if source not in current:
+            current.append(source)
+
+
+def read_dot_file(dot_file, source=None):
+    """
+    解析DOT文件，返回新的KgRegistry，source为记录在节点和关系上的来源
+    """
+    with open(dot_file, 'r', encoding='utf-8') as f:
+        return KgRegistry(source).read_dot(f)
+
+
+def dot_to_cypher(dot_data):
+    """
+    DOT转Cypher核心逻辑
+    """
+    return KgRegistry().read_dot(io.StringIO(dot_data)).cypher_commands()
 
 
 def import_kg_to_neo4j(cypher_commands):
@@ -102,7 +483,7 @@ def import_kg_to_neo4j(cypher_commands):
     批量执行Cypher语句
     """
     try:
-        tx = graph.begin()
+        tx = get_graph().begin()
         for cmd in cypher_commands:
             tx.run(cmd['statement'], parameters=cmd['parameters'])
         tx.commit()
@@ -111,13 +492,647 @@ def import_kg_to_neo4j(cypher_commands):
         print(f'导入失败: {str(e)}')
 
 
-def create_kg_from_dot(dot_file):
-    with open(dot_file, 'r', encoding='utf-8') as f:
-        dot_data = f.read()
-    cypher = dot_to_cypher(dot_data)
-    print(node_id_names)
-    import_kg_to_neo4j(cypher)
+def batched(rows, batch_size):
+    """
+    把参数行按batch_size分组
+    """
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+class GraphSink:
+    """
+    图写入目标：Cypher生成与执行分离，sink只需实现 run(statement, rows)
+
+    statement是本模块定义的语句常量，rows为UNWIND的参数行（约束语句为None）。
+    concurrent为True的sink可以被多个线程同时调用。
+    """
+
+    concurrent = False
+
+    def run(self, statement, rows=None):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BoltSink(GraphSink):
+    """
+    通过Bolt写入Neo4j，每次run自动提交
+    """
+
+    concurrent = True
+
+    def run(self, statement, rows=None):
+        if rows is None:
+            get_graph().run(statement)
+        else:
+            get_graph().run(statement, rows=rows)
+
+
+class CypherFileSink(GraphSink):
+    """
+    把每批语句写成可用 cypher-shell -f 执行的.cypher文件，参数行内联为列表字面量
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def run(self, statement, rows=None):
+        statement = ' '.join(statement.split())
+        if rows is not None:
+            statement = statement.replace('$rows', cypher_literal(rows))
+        self._file.write(statement + ';\n')
+
+    def close(self):
+        self._file.close()
+
+
+class CsvSink(GraphSink):
+    """
+    写成neo4j-admin离线导入用的CSV，只支持节点和关系的首次导入
+    """
+
+    def __init__(self, output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+        self.nodes_path = os.path.join(output_dir, CSV_NODES_FILE)
+        self.relationships_path = os.path.join(output_dir, CSV_RELATIONSHIPS_FILE)
+        self._nodes_file = open(self.nodes_path, 'w', encoding='utf-8', newline='')
+        self._relationships_file = open(self.relationships_path, 'w', encoding='utf-8', newline='')
+        self._nodes_writer = csv.writer(self._nodes_file)
+        self._relationships_writer = csv.writer(self._relationships_file)
+        self._nodes_writer.writerow(CSV_NODES_HEADER)
+        self._relationships_writer.writerow(CSV_RELATIONSHIPS_HEADER)
+        self._written_edges = set()  # 已写出的关系ID对，去掉重复关系
+        self.node_count = 0
+        self.edge_count = 0
+
+    def run(self, statement, rows=None):
+        if statement == CONSTRAINT_STATEMENT:
+            return
+        if statement == MERGE_NODES_STATEMENT:
+            for row in rows:
+                self._nodes_writer.writerow([entity_id(row['name']), row['name'], row['type'], 'Entity',
+                                             CSV_ARRAY_DELIMITER.join(row['sources'])])
+            self.node_count += len(rows)
+        elif statement == MERGE_EDGES_STATEMENT:
+            for row in rows:
+                edge = (entity_id(row['parent']), entity_id(row['child']))
+                if edge in self._written_edges:
+                    continue
+                self._written_edges.add(edge)
+                self._relationships_writer.writerow([edge[0], edge[1], 'HAS_FEATURE',
+                                                     CSV_ARRAY_DELIMITER.join(row['sources'])])
+                self.edge_count += 1
+        else:
+            raise ValueError('CSV只能用于首次全量导入，不支持增量同步')
+
+    def close(self):
+        self._nodes_file.close()
+        self._relationships_file.close()
+
+
+class MemorySink(GraphSink):
+    """
+    内存中的图，用于不连接数据库的试运行和基准测试
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.edges = set()
+        self.sources = {}  # 节点名称或(起点, 终点) -> 来源列表
+        self.has_constraint = False
+
+    def _remove_source(self, key, source):
+        """去掉一个来源，返回是否已没有任何来源"""
+        sources = [item for item in self.sources.get(key, []) if item != source]
+        self.sources[key] = sources
+        return not sources
+
+    def run(self, statement, rows=None):
+        if statement == CONSTRAINT_STATEMENT:
+            self.has_constraint = True
+        elif statement == MERGE_NODES_STATEMENT:
+            for row in rows:
+                self.nodes.setdefault(row['name'], row['type'])
+                _add_sources(self.sources, row['name'], row['sources'])
+        elif statement == SET_NODE_TYPES_STATEMENT:
+            for row in rows:
+                if row['name'] in self.nodes:
+                    self.nodes[row['name']] = row['type']
+        elif statement == MERGE_EDGES_STATEMENT:
+            for row in rows:
+                if row['parent'] in self.nodes and row['child'] in self.nodes:
+                    self.edges.add((row['parent'], row['child']))
+                    _add_sources(self.sources, (row['parent'], row['child']), row['sources'])
+        elif statement == REMOVE_EDGE_SOURCE_STATEMENT:
+            for row in rows:
+                edge = (row['parent'], row['child'])
+                if edge in self.edges and self._remove_source(edge, row['source']):
+                    self.edges.discard(edge)
+                    del self.sources[edge]
+        elif statement == REMOVE_NODE_SOURCE_STATEMENT:
+            linked = {name for edge in self.edges for name in edge}
+            for row in rows:
+                name = row['name']
+                if name in self.nodes and self._remove_source(name, row['source']) and name not in linked:
+                    self.nodes.pop(name)
+                    del self.sources[name]
+        else:
+            raise ValueError(f'内存图不支持的语句: {statement}')
+
+
+SINKS = {
+    'bolt': lambda output: BoltSink(),
+    'cypher': lambda output: CypherFileSink(output),
+    'csv': lambda output: CsvSink(output),
+    'memory': lambda output: MemorySink(),
+}
+
+
+def cypher_literal(value):
+    """
+    把参数转换为Cypher字面量；JSON字符串转义与Cypher兼容，map的键不加引号
+    """
+    if isinstance(value, dict):
+        return '{' + ', '.join(f'{key}: {cypher_literal(item)}' for key, item in value.items()) + '}'
+    if isinstance(value, (list, tuple)):
+        return '[' + ', '.join(cypher_literal(item) for item in value) + ']'
+    return json.dumps(value, ensure_ascii=False)
+
+
+def run_batches(statement, rows, batch_size, sink):
+    """
+    按批执行UNWIND语句，每批自动提交，返回批次数
+    """
+    batches = 0
+    for batch in batched(rows, batch_size):
+        sink.run(statement, batch)
+        batches += 1
+    return batches
+
+
+def bulk_import_kg_to_neo4j(registry, batch_size=BATCH_SIZE, sink=None):
+    """
+    批量导入：先建name唯一约束，再按批UNWIND + MERGE节点和关系
+
+    节点全部写入后再写关系；MERGE保证重复导入不会产生重复的节点和关系。
+    sink默认为Bolt连接。
+    """
+    sink = sink or BoltSink()
+    sink.run(CONSTRAINT_STATEMENT)
+
+    start = time.perf_counter()
+    node_batches = run_batches(MERGE_NODES_STATEMENT, registry.node_rows(), batch_size, sink)
+    node_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    edge_batches = run_batches(MERGE_EDGES_STATEMENT, registry.edge_rows(), batch_size, sink)
+    edge_seconds = time.perf_counter() - start
+
+    print(f'节点: {registry.node_count} 个, {node_batches} 批, {node_seconds:.2f}s, '
+          f'{registry.node_count / node_seconds if node_seconds else 0:.0f} 个/秒')
+    print(f'关系: {registry.edge_count} 条, {edge_batches} 批, {edge_seconds:.2f}s, '
+          f'{registry.edge_count / edge_seconds if edge_seconds else 0:.0f} 条/秒')
+    print(f'批大小 {batch_size}, 总耗时 {node_seconds + edge_seconds:.2f}s')
+
+
+def manifest_path(dot_file):
+    """
+    记录上次导入内容的清单文件路径
+    """
+    return f'{dot_file}.kg_manifest.json'
+
+
+def load_manifest(dot_file):
+    path = manifest_path(dot_file)
+    if not os.path.exists(path):
+        return {}, set()
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    return manifest['nodes'], {tuple(edge) for edge in manifest['edges']}
+
+
+def dot_source(dot_file):
+    """
+    记录在节点和关系sources上的来源：沿用清单中的source，没有清单时为DOT文件的绝对路径
+    """
+    path = manifest_path(dot_file)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            source = json.load(f).get('source')
+        if source:
+            return source
+    return os.path.abspath(dot_file)
+
+
+def save_manifest(dot_file, nodes, edges, source):
+    # 先写临时文件再替换，导入中断时不会留下半个清单
+    path = manifest_path(dot_file)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'source': source, 'nodes': nodes,
+                   'edges': sorted(edges)}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def sync_kg_to_neo4j(dot_file, registry, batch_size=BATCH_SIZE, sink=None):
+    """
+    增量同步：与上次导入的清单比较，只发送新增/删除的节点和HAS_FEATURE关系
+
+    没有清单时相当于全量导入（MERGE，可重复执行）。删除的节点和关系只去掉
+    本文件的来源，其他DOT文件仍在声明的同名节点和关系会保留；节点还要在不再
+    有任何关系时才会从库中删除。同步成功后更新清单。
+    """
+    source = registry.source or dot_source(dot_file)
+    nodes, edges = registry.snapshot()
+    old_nodes, old_edges = load_manifest(dot_file)
+
+    added_nodes = [{'name': name, 'type': node_type, 'sources': [source]}
+                   for name, node_type in nodes.items() if name not in old_nodes]
+    changed_nodes = [{'name': name, 'type': node_type} for name, node_type in nodes.items()
+                     if name in old_nodes and old_nodes[name] != node_type]
+    removed_nodes = [{'name': name, 'source': source} for name in old_nodes if name not in nodes]
+    added_edges = [{'parent': parent, 'child': child, 'sources': [source]} for parent, child in edges - old_edges]
+    removed_edges = [{'parent': parent, 'child': child, 'source': source} for parent, child in old_edges - edges]
+
+    sink = sink or BoltSink()
+    start = time.perf_counter()
+    sink.run(CONSTRAINT_STATEMENT)
+    run_batches(REMOVE_EDGE_SOURCE_STATEMENT, removed_edges, batch_size, sink)
+    run_batches(MERGE_NODES_STATEMENT, added_nodes, batch_size, sink)
+    run_batches(SET_NODE_TYPES_STATEMENT, changed_nodes, batch_size, sink)
+    run_batches(MERGE_EDGES_STATEMENT, added_edges, batch_size, sink)
+    run_batches(REMOVE_NODE_SOURCE_STATEMENT, removed_nodes, batch_size, sink)
+    # 内存图只是试运行，不更新清单
+    if not isinstance(sink, MemorySink):
+        save_manifest(dot_file, nodes, edges, source)
+
+    print(f'增量同步 {dot_file}: 节点 +{len(added_nodes)} -{len(removed_nodes)} ~{len(changed_nodes)}, '
+          f'关系 +{len(added_edges)} -{len(removed_edges)}, 耗时 {time.perf_counter() - start:.2f}s')
+
+
+# neo4j-admin database import 的CSV表头
+CSV_NODES_HEADER = ['entityId:ID(Entity)', 'name', 'type', ':LABEL', 'sources:string[]']
+CSV_RELATIONSHIPS_HEADER = [':START_ID(Entity)', ':END_ID(Entity)', ':TYPE', 'sources:string[]']
+CSV_ARRAY_DELIMITER = ';'  # neo4j-admin --array-delimiter 的默认值
+CSV_NODES_FILE = 'entities.csv'
+CSV_RELATIONSHIPS_FILE = 'has_feature.csv'
+NODE_TYPES = {'ChapterSection', 'Feature'}
+
+
+def entity_id(name):
+    """
+    由节点名称计算稳定的ID，不同文件、不同次导出结果一致
+    """
+    return hashlib.sha1(name.encode('utf-8')).hexdigest()[:16]
+
+
+def export_kg_to_csv(dot_file, output_dir, batch_size=BATCH_SIZE):
+    """
+    把DOT文件转换为neo4j-admin离线导入用的节点/关系CSV，边解析边写入
+
+    新登记的节点或关系每累积batch_size个就写出一批，登记表只保留去重所需的名称和关系ID。
+
+    Returns:
+        tuple: (节点CSV路径, 关系CSV路径)
+    """
+    start = time.perf_counter()
+    registry = KgRegistry(dot_source(dot_file))
+    nodes_done = edges_done = 0
+    with open(dot_file, 'r', encoding='utf-8') as f, CsvSink(output_dir) as sink:
+        def flush():
+            nonlocal nodes_done, edges_done
+            run_batches(MERGE_NODES_STATEMENT, registry.node_rows(nodes_done), batch_size, sink)
+            run_batches(MERGE_EDGES_STATEMENT, registry.edge_rows(edges_done), batch_size, sink)
+            nodes_done, edges_done = registry.node_count, registry.edge_count
+
+        for _ in registry.iter_read_dot(f):
+            if registry.node_count - nodes_done >= batch_size or registry.edge_count - edges_done >= batch_size:
+                flush()
+        flush()
+
+    print(f'导出完成: 节点 {sink.node_count} 个, 关系 {sink.edge_count} 条, 耗时 {time.perf_counter() - start:.2f}s')
+    print(f'导入命令: neo4j-admin database import full --nodes={sink.nodes_path} '
+          f'--relationships={sink.relationships_path} <数据库名>')
+    return sink.nodes_path, sink.relationships_path
+
+
+def validate_kg_csv(nodes_path, relationships_path):
+    """
+    离线检查导出的CSV：表头、ID和名称唯一、类型合法、关系两端都存在
+
+    Returns:
+        list: 错误信息，为空表示通过
+    """
+    errors = []
+    ids = set()
+    names = set()
+    with open(nodes_path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        if next(reader, None) != CSV_NODES_HEADER:
+            errors.append(f'{nodes_path}: 表头应为 {",".join(CSV_NODES_HEADER)}')
+        for line_no, row in enumerate(reader, 2):
+            if len(row) != len(CSV_NODES_HEADER):
+                errors.append(f'{nodes_path}:{line_no}: 列数为 {len(row)}')
+                continue
+            node_id, name, node_type, label, _ = row
+            if node_id in ids:
+                errors.append(f'{nodes_path}:{line_no}: ID重复 {node_id}')
+            if not name:
+                errors.append(f'{nodes_path}:{line_no}: 名称为空')
+            elif name in names:
+                errors.append(f'{nodes_path}:{line_no}: 名称重复 {name}')
+            if node_type not in NODE_TYPES:
+                errors.append(f'{nodes_path}:{line_no}: 未知类型 {node_type}')
+            if label != 'Entity':
+                errors.append(f'{nodes_path}:{line_no}: 标签应为Entity')
+            ids.add(node_id)
+            names.add(name)
+
+    edges = set()
+    with open(relationships_path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        if next(reader, None) != CSV_RELATIONSHIPS_HEADER:
+            errors.append(f'{relationships_path}: 表头应为 {",".join(CSV_RELATIONSHIPS_HEADER)}')
+        for line_no, row in enumerate(reader, 2):
+            if len(row) != len(CSV_RELATIONSHIPS_HEADER):
+                errors.append(f'{relationships_path}:{line_no}: 列数为 {len(row)}')
+                continue
+            start_id, end_id, rel_type, _ = row
+            for endpoint in (start_id, end_id):
+                if endpoint not in ids:
+                    errors.append(f'{relationships_path}:{line_no}: 节点不存在 {endpoint}')
+            if rel_type != 'HAS_FEATURE':
+                errors.append(f'{relationships_path}:{line_no}: 未知关系类型 {rel_type}')
+            if (start_id, end_id) in edges:
+                errors.append(f'{relationships_path}:{line_no}: 关系重复')
+            edges.add((start_id, end_id))
+
+    print(f'校验: 节点 {len(ids)} 个, 关系 {len(edges)} 条, 错误 {len(errors)} 个')
+    return errors
+
+
+def create_kg_from_dot(dot_file, incremental=False, sink=None, batch_size=BATCH_SIZE):
+    """
+    解析DOT文件并导入知识图谱
+
+    incremental为True时只同步与上次导入相比的变化，否则全量批量导入；
+    两种方式都会更新清单文件，供下次增量同步使用。sink默认为Bolt连接。
+    """
+    registry = read_dot_file(dot_file, dot_source(dot_file))
+    print(f'{dot_file}: 节点 {registry.node_count} 个, 关系 {registry.edge_count} 条')
+    if incremental:
+        sync_kg_to_neo4j(dot_file, registry, batch_size, sink)
+    else:
+        bulk_import_kg_to_neo4j(registry, batch_size, sink)
+        if not isinstance(sink, MemorySink):
+            save_manifest(dot_file, *registry.snapshot(), registry.source)
+
+
+def find_dot_files(inputs):
+    """
+    展开目录（递归查找*.dot）和通配符，返回去重排序后的文件列表
+    """
+    found = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            found.update(glob.glob(os.path.join(item, '**', '*.dot'), recursive=True))
+        elif glob.has_magic(item):
+            found.update(glob.glob(item, recursive=True))
+        else:
+            found.add(item)
+    return sorted(found)
+
+
+def _parse_dot_worker(dot_file, source):
+    # 在子进程中解析，只把名称、类型和关系数组传回主进程
+    start = time.perf_counter()
+    registry = read_dot_file(dot_file, source)
+    registry.dot_ids = {}
+    return registry, time.perf_counter() - start
+
+
+def run_with_retry(sink, statement, rows, retries, backoff):
+    """
+    执行一批语句，失败时按指数退避重试，最终失败时抛出最后一次的异常
+    """
+    for attempt in range(retries + 1):
+        try:
+            sink.run(statement, rows)
+            return
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = backoff * 2 ** attempt
+            print(f'批次写入失败（第{attempt + 1}次）: {e}，{delay:.1f}s后重试')
+            time.sleep(delay)
+
+
+def write_batches_concurrently(statement, rows, batch_size, sink, writers, retries, backoff):
+    """
+    用最多writers个线程并发写入各批，返回 (成功批数, 失败批数)
+    """
+    done = failed = 0
+    with ThreadPoolExecutor(max_workers=writers) as executor:
+        futures = {}
+        for batch in batched(rows, batch_size):
+            # 最多排队 2*writers 批，避免一次性生成全部参数行
+            if len(futures) >= 2 * writers:
+                finished = next(as_completed(futures))
+                futures.pop(finished)
+                if finished.exception() is None:
+                    done += 1
+                else:
+                    failed += 1
+                    print(f'批次最终写入失败: {finished.exception()}')
+            futures[executor.submit(run_with_retry, sink, statement, batch, retries, backoff)] = len(batch)
+        for future in as_completed(futures):
+            if future.exception() is None:
+                done += 1
+            else:
+                failed += 1
+                print(f'批次最终写入失败: {future.exception()}')
+    return done, failed
+
+
+def ingest_dot_files(inputs, workers=None, writers=4, sink=None, batch_size=BATCH_SIZE,
+                     retries=3, backoff=1.0):
+    """
+    多文件导入：进程池并行解析DOT文件，按名称全局去重合并后，
+    用有限个并发会话按批写入，失败的批次按指数退避重试
+
+    Returns:
+        dict: 文件数、失败文件、节点/关系数、各阶段耗时和失败批数
+    """
+    sink = sink or BoltSink()
+    dot_files = find_dot_files(inputs)
+    merged = KgRegistry()
+    failed_files = []
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_parse_dot_worker, dot_file, dot_source(dot_file)): dot_file
+                   for dot_file in dot_files}
+        for done, future in enumerate(as_completed(futures), 1):
+            dot_file = futures[future]
+            try:
+                registry, seconds = future.result()
+            except Exception as e:
+                failed_files.append((dot_file, str(e)))
+                print(f'[{done}/{len(dot_files)}] {dot_file} 解析失败: {e}')
+                continue
+            merged.merge(registry)
+            print(f'[{done}/{len(dot_files)}] {dot_file}: 节点 {registry.node_count} 个, '
+                  f'关系 {registry.edge_count} 条, {seconds:.2f}s')
+    # 多个文件中相同的关系只写一次
+    merged.dedupe_edges()
+    parse_seconds = time.perf_counter() - start
+
+    # 节点全部写完后再写关系；不支持并发的sink只用一个写线程
+    writers = writers if sink.concurrent else 1
+    start = time.perf_counter()
+    sink.run(CONSTRAINT_STATEMENT)
+    node_batches = write_batches_concurrently(MERGE_NODES_STATEMENT, merged.node_rows(), batch_size,
+                                              sink, writers, retries, backoff)
+    edge_batches = write_batches_concurrently(MERGE_EDGES_STATEMENT, merged.edge_rows(), batch_size,
+                                              sink, writers, retries, backoff)
+    write_seconds = time.perf_counter() - start
+
+    summary = {
+        'files': len(dot_files),
+        'failed_files': failed_files,
+        'nodes': merged.node_count,
+        'edges': merged.edge_count,
+        'parse_seconds': parse_seconds,
+        'write_seconds': write_seconds,
+        'failed_batches': node_batches[1] + edge_batches[1],
+    }
+    print(f'共 {summary["files"]} 个文件（解析失败 {len(failed_files)} 个）, 节点 {summary["nodes"]} 个, '
+          f'关系 {summary["edges"]} 条')
+    print(f'解析 {parse_seconds:.2f}s, 写入 {write_seconds:.2f}s（{writers} 个会话, '
+          f'{node_batches[0] + edge_batches[0]} 批成功, {summary["failed_batches"]} 批失败）')
+    return summary
+
+
+def generate_synthetic_dot(path, node_count, seed=0):
+    """
+    生成与AST导出格式相同的合成DOT文件：每1000个节点一个子图，
+    节点为record标签（章节|{特性...}），每个节点指向后面的1~3个节点
+    """
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('digraph AST {\n  node [shape=record];\n')
+        for cluster_start in range(0, node_count, 1000):
+            cluster_end = min(cluster_start + 1000, node_count)
+            f.write(f'  subgraph cluster_{cluster_start} {{\n')
+            for i in range(cluster_start, cluster_end):
+                features = '|'.join(f'{i}.{k} 特性{i}_{k}' for k in range(rng.randrange(4)))
+                label = f'{i} 章节{i}|{{{features}}}' if features else f'{i} 章节{i}'
+                f.write(f'    n{i} [label="{label}"];\n')
+            for i in range(cluster_start, cluster_end - 1):
+                children = ' '.join(f'n{j}' for j in range(i + 1, min(i + 1 + rng.randrange(1, 4), cluster_end)))
+                f.write(f'    n{i} -> {{{children}}};\n')
+            f.write('  }\n')
+        f.write('}\n')
+
+
+def benchmark(node_counts, sink_name='memory', output=None, batch_size=BATCH_SIZE):
+    """
+    在合成DOT图上分别测量DOT解析、Cypher命令生成和写入sink的吞吐量
+    """
+    print(f'{"节点数":>10} {"文件MB":>8} {"解析(s)":>9} {"生成(s)":>9} {"写入(s)":>9} '
+          f'{"解析 节点/秒":>14} {"写入 行/秒":>12}')
+    with tempfile.TemporaryDirectory() as tmp:
+        for node_count in node_counts:
+            dot_path = os.path.join(tmp, f'synthetic_{node_count}.dot')
+            generate_synthetic_dot(dot_path, node_count)
+            size_mb = os.path.getsize(dot_path) / 1024 / 1024
+
+            start = time.perf_counter()
+            with open(dot_path, 'r', encoding='utf-8') as f:
+                for _ in DotReader(f).iter_events():
+                    pass
+            parse_seconds = time.perf_counter() - start
+
+            # 命令生成包含解析，单独的生成耗时用差值表示
+            start = time.perf_counter()
+            registry = read_dot_file(dot_path)
+            generate_seconds = time.perf_counter() - start - parse_seconds
+
+            sink_output = output or os.path.join(tmp, f'sink_{node_count}')
+            with SINKS[sink_name](sink_output if sink_name == 'csv' else f'{sink_output}.cypher') as sink, \
+                    open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                start = time.perf_counter()
+                bulk_import_kg_to_neo4j(registry, batch_size, sink)
+                sink_seconds = time.perf_counter() - start
+
+            print(f'{node_count:>10} {size_mb:>8.1f} {parse_seconds:>9.2f} {generate_seconds:>9.2f} '
+                  f'{sink_seconds:>9.2f} {node_count / parse_seconds:>14.0f} '
+                  f'{(registry.node_count + registry.edge_count) / sink_seconds if sink_seconds else 0:>12.0f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='解析AST的DOT文件并导入Neo4j知识图谱')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help='导入DOT文件')
+    import_parser.add_argument('dot_file', nargs='?', default='./AST_windows_deepseek_1.5.dot')
+    import_parser.add_argument('--incremental', action='store_true', help='按清单增量同步')
+    import_parser.add_argument('--sink', choices=sorted(SINKS), default='bolt')
+    import_parser.add_argument('--output', help='cypher/csv sink的输出路径')
+    import_parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    export_parser = subparsers.add_parser('export-csv', help='导出neo4j-admin离线导入CSV')
+    export_parser.add_argument('dot_file')
+    export_parser.add_argument('output_dir')
+
+    validate_parser = subparsers.add_parser('validate-csv', help='离线校验导出的CSV')
+    validate_parser.add_argument('nodes_csv')
+    validate_parser.add_argument('relationships_csv')
+
+    ingest_parser = subparsers.add_parser('ingest', help='并行导入多个DOT文件（目录或通配符）')
+    ingest_parser.add_argument('inputs', nargs='+')
+    ingest_parser.add_argument('--workers', type=int, default=os.cpu_count(), help='解析进程数')
+    ingest_parser.add_argument('--writers', type=int, default=4, help='并发写入会话数')
+    ingest_parser.add_argument('--sink', choices=sorted(SINKS), default='bolt')
+    ingest_parser.add_argument('--output', help='cypher/csv sink的输出路径')
+    ingest_parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    ingest_parser.add_argument('--retries', type=int, default=3, help='失败批次的重试次数')
 
+    benchmark_parser = subparsers.add_parser('benchmark', help='在合成DOT图上测量各阶段吞吐量')
+    benchmark_parser.add_argument('--nodes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    benchmark_parser.add_argument('--sink', choices=sorted(SINKS), default='memory')
+    benchmark_parser.add_argument('--output', help='cypher/csv sink的输出路径，默认写到临时目录')
+    benchmark_parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
 
-dot_file = "./AST_windows_deepseek_1.5.dot"
-create_kg_from_dot(dot_file)
+    args = parser.parse_args()
+    if args.command in ('import', 'ingest') and args.sink in ('cypher', 'csv') and not args.output:
+        parser.error('cypher/csv sink需要指定 --output')
+    if args.command == 'import':
+        with SINKS[args.sink](args.output) as sink:
+            create_kg_from_dot(args.dot_file, args.incremental, sink, args.batch_size)
+    elif args.command == 'ingest':
+        with SINKS[args.sink](args.output) as sink:
+            summary = ingest_dot_files(args.inputs, args.workers, args.writers, sink, args.batch_size, args.retries)
+        sys.exit(1 if summary['failed_files'] or summary['failed_batches'] else 0)
+    elif args.command == 'export-csv':
+        export_kg_to_csv(args.dot_file, args.output_dir)
+    elif args.command == 'validate-csv':
+        errors = validate_kg_csv(args.nodes_csv, args.relationships_csv)
+        for error in errors:
+            print(error)
+        sys.exit(1 if errors else 0)
+    else:
+        benchmark(args.nodes, args.sink, args.output, args.batch_size)
@@ -1,75 +1,1061 @@
 # -*- coding: utf-8 -*-  
 
-from fastapi import FastAPI, UploadFile, File
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager, contextmanager
 from pathlib import Path
+from typing import Optional
 from paddleocr import PPStructureV3
+from PyPDF2 import PdfReader
 import uvicorn
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
 import os
+import queue
+import shutil
+import sys
+import threading
+import time
+import uuid
 from markdown_to_docx import markdown_to_docx_with_images
+from split_pdf import extract_pages
+# 图片保存相关配置（IMAGE_SAVE_*、PNG_COMPRESS_LEVEL）和分页并行子进程的入口在paddle_ocr_worker中
+from paddle_ocr_worker import (image_executor, image_save_format, image_save_quality, init_page_worker,
+                               ocr_page_range, page_without_images, save_img, wait_for_images)
+
+try:
+    import resource
+except ImportError:  # Windows没有resource模块
+    resource = None
 
 '''
     该项目基于PaddleOCR实现PDF转Markdown功能。
     项目结构：
     - app.py: 主应用文件，定义了FastAPI应用和路由。
     - static/: 静态文件目录，包含前端页面。
-    - uploads/: 上传文件目录，用于存储上传的PDF文件。
-    - output/: 输出文件目录，用于存储转换后的Markdown文件。
+    - workspaces/: 任务工作目录，每个任务一个子目录，存放上传的PDF（input.pdf）和
+      转换结果（output/），超过保留时间后自动清理。
 '''
 
-app = FastAPI()
+# 配置变量
+pipeline_pool_size = int(os.environ.get("PIPELINE_POOL_SIZE", "1"))  # 常驻的PPStructureV3实例数
+pipeline_config = {}  # 创建PPStructureV3时传入的参数
+job_workers = int(os.environ.get("JOB_WORKERS", str(pipeline_pool_size)))  # 同时执行的转换任务数
+max_queued_jobs = int(os.environ.get("MAX_QUEUED_JOBS", "16"))  # 排队任务上限，超出返回429
+workspace_root = Path(os.environ.get("WORKSPACE_ROOT", "workspaces"))  # 任务工作目录的根目录
+workspace_ttl = int(os.environ.get("WORKSPACE_TTL", "3600"))  # 任务结束后工作目录的保留时间（秒）
+workspace_cleanup_interval = 300  # 清理过期工作目录的间隔（秒）
+upload_chunk_size = 1024 * 1024  # 分块写入上传文件的块大小
+page_parallel_workers = int(os.environ.get("PAGE_PARALLEL_WORKERS", "0"))  # 分页并行的CPU进程数，0表示关闭
+page_chunk_size = int(os.environ.get("PAGE_CHUNK_SIZE", "10"))  # 每个子进程一次处理的页数
+page_parallel_min_pages = int(os.environ.get("PAGE_PARALLEL_MIN_PAGES", "30"))  # 自动启用分页并行的最小页数
+result_cache_dir = Path(os.environ.get("RESULT_CACHE_DIR", "cache/results"))  # 转换结果缓存目录
+result_cache_max_bytes = int(os.environ.get("RESULT_CACHE_MAX_BYTES", str(10 * 1024 ** 3)))  # 缓存总大小上限，0表示关闭
+page_cache_dir = Path(os.environ.get("PAGE_CACHE_DIR", "cache/pages"))  # 单页识别结果缓存目录
+page_cache_max_bytes = int(os.environ.get("PAGE_CACHE_MAX_BYTES", str(10 * 1024 ** 3)))  # 单页缓存总大小上限，0表示关闭
+log_level = os.environ.get("LOG_LEVEL", "INFO").upper()  # 生产环境可设为WARNING，DEBUG时输出每页的识别结果
+
+logging.basicConfig(level=log_level, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+logger = logging.getLogger("paddle_ocr_web")
+
+
+
+class Metrics:
+    """
+    服务运行指标，按Prometheus文本格式输出
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stage_seconds = {}  # 阶段 -> [次数, 总耗时, 最大耗时]
+        self.jobs_total = {}  # 结束状态 -> 任务数
+        self.pages_total = {"ocr": 0, "page_cache": 0, "result_cache": 0}
+        self.ocr_seconds_total = 0.0
+        self.last_pages_per_second = 0.0
+
+    def observe_stage(self, stage, seconds):
+        with self._lock:
+            stat = self.stage_seconds.setdefault(stage, [0, 0.0, 0.0])
+            stat[0] += 1
+            stat[1] += seconds
+            stat[2] = max(stat[2], seconds)
+
+    def observe_job(self, job):
+        with self._lock:
+            self.jobs_total[job.status] = self.jobs_total.get(job.status, 0) + 1
+            self.pages_total["ocr"] += job.pages_ocr
+            cached_pages = job.pages_done - job.pages_ocr
+            self.pages_total["result_cache" if job.cached else "page_cache"] += cached_pages
+            ocr_seconds = job.timings.get("predict", 0.0)
+            self.ocr_seconds_total += ocr_seconds
+            if job.pages_ocr and ocr_seconds:
+                self.last_pages_per_second = job.pages_ocr / ocr_seconds
+
+    def render(self):
+        with jobs_lock:
+            statuses = [job.status for job in jobs.values()]
+        lines = [
+            "# TYPE paddle_ocr_queue_depth gauge",
+            f"paddle_ocr_queue_depth {statuses.count('queued')}",
+            "# TYPE paddle_ocr_jobs_running gauge",
+            f"paddle_ocr_jobs_running {statuses.count('running')}",
+            "# TYPE paddle_ocr_pipeline_pool_size gauge",
+            f"paddle_ocr_pipeline_pool_size {pipeline_pool.size}",
+            "# TYPE paddle_ocr_pipeline_pool_loaded gauge",
+            f"paddle_ocr_pipeline_pool_loaded {pipeline_pool.loaded}",
+            "# TYPE paddle_ocr_pipeline_pool_busy gauge",
+            f"paddle_ocr_pipeline_pool_busy {pipeline_pool.busy}",
+            "# TYPE paddle_ocr_pipeline_pool_utilization gauge",
+            f"paddle_ocr_pipeline_pool_utilization {pipeline_pool.busy / pipeline_pool.size if pipeline_pool.size else 0:.3f}",
+        ]
+        with self._lock:
+            lines.append("# TYPE paddle_ocr_jobs_total counter")
+            for status, count in sorted(self.jobs_total.items()):
+                lines.append(f'paddle_ocr_jobs_total{{status="{status}"}} {count}')
+            lines.append("# TYPE paddle_ocr_pages_total counter")
+            for source, count in sorted(self.pages_total.items()):
+                lines.append(f'paddle_ocr_pages_total{{source="{source}"}} {count}')
+            lines += [
+                "# TYPE paddle_ocr_ocr_seconds_total counter",
+                f"paddle_ocr_ocr_seconds_total {self.ocr_seconds_total:.6f}",
+                "# TYPE paddle_ocr_last_job_pages_per_second gauge",
+                f"paddle_ocr_last_job_pages_per_second {self.last_pages_per_second:.3f}",
+                "# TYPE paddle_ocr_stage_seconds summary",
+            ]
+            for stage, (count, total, longest) in sorted(self.stage_seconds.items()):
+                lines.append(f'paddle_ocr_stage_seconds_count{{stage="{stage}"}} {count}')
+                lines.append(f'paddle_ocr_stage_seconds_sum{{stage="{stage}"}} {total:.6f}')
+                lines.append(f'paddle_ocr_stage_seconds_max{{stage="{stage}"}} {longest:.6f}')
+        for name, cache in (("results", result_cache), ("pages", page_cache)):
+            stats = cache.stats()
+            lines.append(f'paddle_ocr_cache_hits_total{{cache="{name}"}} {stats["hits"]}')
+            lines.append(f'paddle_ocr_cache_misses_total{{cache="{name}"}} {stats["misses"]}')
+            lines.append(f'paddle_ocr_cache_bytes{{cache="{name}"}} {stats["total_bytes"]}')
+        peak_rss = peak_rss_bytes()
+        if peak_rss is not None:
+            lines.append("# TYPE paddle_ocr_peak_rss_bytes gauge")
+            lines.append(f"paddle_ocr_peak_rss_bytes {peak_rss}")
+        return "\n".join(lines) + "\n"
+
+
+def peak_rss_bytes():
+    """进程峰值常驻内存，不支持的平台返回None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux单位为KB，macOS为字节
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+@contextmanager
+def stage_timer(job, stage):
+    """记录一个阶段的耗时，同时计入任务的timings和全局指标"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        job.timings[stage] = job.timings.get(stage, 0.0) + elapsed
+        metrics.observe_stage(stage, elapsed)
+
+
+class PipelinePool:
+    """
+    PPStructureV3管线池：应用启动时预先加载模型，每个请求借出一个管线，用完归还
+    """
+
+    def __init__(self, size, config=None):
+        self.size = size
+        self.config = config or {}
+        self.loaded = 0
+        self.error = None
+        self._idle = queue.Queue()
+
+    def start(self):
+        """在后台线程中加载模型，服务可以先启动，通过/ready查询加载进度"""
+        threading.Thread(target=self._load, name="pipeline-loader", daemon=True).start()
+
+    def _load(self):
+        for _ in range(self.size):
+            try:
+                pipeline = PPStructureV3(**self.config)
+            except Exception as e:
+                self.error = str(e)
+                logger.error("模型加载失败: %s", e)
+                return
+            self.loaded += 1
+            self._idle.put(pipeline)
+            logger.info("模型已加载: %d/%d", self.loaded, self.size)
+
+    @property
+    def ready(self):
+        return self.loaded == self.size
+
+    @property
+    def busy(self):
+        """已借出的管线数"""
+        return self.loaded - self._idle.qsize()
+
+    def checkout(self):
+        """借出一个空闲管线，没有空闲管线时阻塞等待"""
+        while True:
+            try:
+                return self._idle.get(timeout=1)
+            except queue.Empty:
+                if self.error is not None and self.loaded == 0:
+                    raise RuntimeError(f"模型加载失败: {self.error}")
+
+    def checkin(self, pipeline):
+        """归还管线"""
+        self._idle.put(pipeline)
+
+
+class DiskCache:
+    """
+    磁盘缓存基类：每个键一个目录，按总大小做LRU淘汰，并统计命中/未命中次数
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.total_bytes = 0
+        self._entries = OrderedDict()  # key -> 占用字节数，按最近使用排序
+        self._lock = threading.Lock()
+        if self.enabled:
+            self._load()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _load(self):
+        # 启动时扫描已有缓存，按最近访问时间恢复LRU顺序
+        self.root.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for path in self.root.iterdir():
+            meta_path = path / "meta.json"
+            if path.is_dir() and meta_path.exists():
+                entries.append((meta_path.stat().st_mtime, path.name, directory_size(path)))
+            elif path.name.startswith(".tmp-"):
+                shutil.rmtree(path, ignore_errors=True)
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self.total_bytes += size
+
+    def _lookup(self, key):
+        """查找条目并更新LRU顺序，命中时返回条目目录"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+        entry_dir = self.root / key
+        try:
+            os.utime(entry_dir / "meta.json")
+        except OSError:
+            pass
+        return entry_dir
+
+    def _lookup_failed(self, key, e):
+        # 条目可能刚被淘汰或文件已损坏，按未命中处理，并删除该条目，之后的put可以重新写入
+        logger.warning("读取缓存失败: %s", e)
+        with self._lock:
+            self.hits -= 1
+            self.misses += 1
+            size = self._entries.pop(key, None)
+            if size is not None:
+                self.total_bytes -= size
+        shutil.rmtree(self.root / key, ignore_errors=True)
+
+    def _new_entry_dir(self, key):
+        return self.root / f".tmp-{key}-{uuid.uuid4().hex}"
+
+    def _commit(self, key, tmp_dir):
+        """写入meta.json后把临时目录原子地移动为正式条目"""
+        with open(tmp_dir / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({"key": key, "created": time.time()}, f)
+        size = directory_size(tmp_dir)
+        with self._lock:
+            if key in self._entries:
+                return
+            os.replace(tmp_dir, self.root / key)
+            self._entries[key] = size
+            self.total_bytes += size
+            evicted = self._evict()
+        for path in evicted:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _evict(self):
+        # 超出容量时淘汰最久未使用的条目，保留最新写入的一条
+        evicted = []
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            evicted.append(self.root / key)
+        return evicted
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "entries": len(self._entries),
+                "total_bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class ResultCache(DiskCache):
+    """
+    转换结果缓存：以上传文件内容的SHA-256和管线配置为键，保存Markdown、图片和docx
+    """
+
+    @staticmethod
+    def make_key(content_hash, config):
+        config_text = json.dumps(config, sort_keys=True, default=str)
+        return hashlib.sha256(f"{content_hash}:{config_text}".encode("utf-8")).hexdigest()
+
+    def get(self, key, output_dir, stem):
+        """
+        命中时把缓存结果链接到output_dir，返回(markdown路径, docx路径)；未命中返回None
+        """
+        entry_dir = self._lookup(key)
+        if entry_dir is None:
+            return None
+        try:
+            markdown_path = output_dir / f"{stem}.md"
+            link_or_copy(entry_dir / "result.md", markdown_path)
+            docx_path = None
+            if (entry_dir / "result.docx").exists():
+                docx_path = output_dir / f"{stem}.docx"
+                link_or_copy(entry_dir / "result.docx", docx_path)
+            images_dir = entry_dir / "files"
+            if images_dir.exists():
+                shutil.copytree(images_dir, output_dir, copy_function=link_or_copy, dirs_exist_ok=True)
+        except OSError as e:
+            self._lookup_failed(key, e)
+            return None
+        return markdown_path, docx_path
+
+    def put(self, key, markdown_path, docx_path, output_dir):
+        """保存一次转换的结果，output_dir中除Markdown和docx以外的文件（图片）一并保存"""
+        if not self.enabled:
+            return
+        tmp_dir = self._new_entry_dir(key)
+        excluded = {Path(markdown_path).name, Path(docx_path).name if docx_path else None}
+        try:
+            shutil.copytree(output_dir, tmp_dir / "files", copy_function=link_or_copy,
+                            ignore=lambda d, names: [n for n in names if Path(d) == Path(output_dir) and n in excluded])
+            link_or_copy(markdown_path, tmp_dir / "result.md")
+            if docx_path:
+                link_or_copy(docx_path, tmp_dir / "result.docx")
+            self._commit(key, tmp_dir)
+        except OSError as e:
+            logger.warning("写入缓存失败: %s", e)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+class PageCache(DiskCache):
+    """
+    单页缓存：以页面内容指纹和管线配置为键，保存该页的res.markdown和它引用的图片，
+    修改过的PDF只需重新识别内容变化的页面
+    """
+
+    @staticmethod
+    def make_key(fingerprint, config):
+        return ResultCache.make_key(f"page:{fingerprint}", config)
+
+    def get(self, key, output_dir):
+        """命中时把该页图片链接到output_dir，返回该页的markdown字典；未命中返回None"""
+        entry_dir = self._lookup(key)
+        if entry_dir is None:
+            return None
+        try:
+            with open(entry_dir / "page.json", "r", encoding="utf-8") as f:
+                page = json.load(f)
+            images_dir = entry_dir / "files"
+            if images_dir.exists():
+                shutil.copytree(images_dir, output_dir, copy_function=link_or_copy, dirs_exist_ok=True)
+        except (OSError, ValueError) as e:
+            self._lookup_failed(key, e)
+            return None
+        return {
+            'markdown_texts': page['markdown_texts'],
+            'page_continuation_flags': tuple(page['page_continuation_flags']),
+            'markdown_images': dict.fromkeys(page['markdown_images']),
+        }
+
+    def put(self, key, page, output_dir):
+        """保存一页的识别结果，图片从output_dir中取（save_img已经写好）"""
+        if not self.enabled:
+            return
+        tmp_dir = self._new_entry_dir(key)
+        try:
+            tmp_dir.mkdir(parents=True)
+            for img_path in page['markdown_images']:
+                target = tmp_dir / "files" / img_path
+                target.parent.mkdir(parents=True, exist_ok=True)
+                link_or_copy(Path(output_dir) / img_path, target)
+            with open(tmp_dir / "page.json", "w", encoding="utf-8") as f:
+                json.dump({
+                    'markdown_texts': page['markdown_texts'],
+                    'page_continuation_flags': list(page['page_continuation_flags']),
+                    'markdown_images': list(page['markdown_images']),
+                }, f, ensure_ascii=False)
+            self._commit(key, tmp_dir)
+        except OSError as e:
+            logger.warning("写入单页缓存失败: %s", e)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def page_fingerprints(pdf_path):
+    """
+    计算每页的内容指纹：页面尺寸、内容流以及引用的图片/表单XObject和字体
+    """
+    reader = PdfReader(str(pdf_path))
+    return [page_fingerprint(page) for page in reader.pages]
+
+
+def page_fingerprint(page):
+    digest = hashlib.sha256()
+    digest.update(repr([float(v) for v in page.mediabox]).encode("ascii"))
+    digest.update(repr(page.get("/Rotate", 0)).encode("ascii"))
+    contents = page.get_contents()
+    if contents is not None:
+        digest.update(contents.get_data())
+    _hash_resources(page.get("/Resources"), digest, set())
+    return digest.hexdigest()
+
+
+def _hash_resources(resources, digest, seen):
+    if resources is None:
+        return
+    resources = resources.get_object()
+    fonts = resources.get("/Font")
+    if fonts is not None:
+        for name, font in sorted(fonts.get_object().items()):
+            digest.update(f"{name}={font.get_object().get('/BaseFont')}".encode("utf-8"))
+    xobjects = resources.get("/XObject")
+    if xobjects is None:
+        return
+    for name, ref in sorted(xobjects.get_object().items()):
+        xobject = ref.get_object()
+        if id(xobject) in seen:
+            continue
+        seen.add(id(xobject))
+        digest.update(name.encode("utf-8"))
+        digest.update(xobject.get_data())
+        # 表单XObject可能继续引用其他资源
+        if xobject.get("/Subtype") == "/Form":
+            _hash_resources(xobject.get("/Resources"), digest, seen)
+
+
+def cache_config():
+    """影响转换结果的配置，作为缓存键的一部分"""
+    return {
+        "pipeline": pipeline_config,
+        "image_save_format": image_save_format,
+        "image_save_quality": image_save_quality,
+    }
+
+
+def directory_size(path):
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+
+def link_or_copy(src, dst):
+    """优先使用硬链接，跨文件系统时退回复制"""
+    # 目标可能是另一个缓存条目文件的硬链接（同名图片），先删除，避免复制时写穿改动该缓存
+    try:
+        os.unlink(dst)
+    except FileNotFoundError:
+        pass
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+    return dst
+
+
+pipeline_pool = PipelinePool(pipeline_pool_size, pipeline_config)
+result_cache = ResultCache(result_cache_dir, result_cache_max_bytes)
+page_cache = PageCache(page_cache_dir, page_cache_max_bytes)
+metrics = Metrics()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # 启动时预加载模型
+    pipeline_pool.start()
+    cleanup_task = asyncio.create_task(cleanup_workspaces_periodically())
+    yield
+    cleanup_task.cancel()
+    job_executor.shutdown(wait=False, cancel_futures=True)
+    image_executor.shutdown(wait=False)
+    if _page_executor is not None:
+        _page_executor.shutdown(wait=False, cancel_futures=True)
+
+
+app = FastAPI(lifespan=lifespan)
 
 # 挂载静态文件目录
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-@app.post("/convert")
-async def convert_pdf_to_markdown(file: UploadFile = File(...)):
+class ConversionJob:
     """
-    接收PDF文件并转换为Markdown
+    一次PDF转换任务的状态
     """
-    # 保存上传的PDF文件
-    pdf_path = Path("temp.pdf")
-    with open(pdf_path, "wb") as f:
-        f.write(await file.read())
-    
-    # 处理PDF
-    pipeline = PPStructureV3()
-    output = pipeline.predict(str(pdf_path))
-    
+
+    def __init__(self, job_id, filename, workspace, page_parallel=None):
+        self.id = job_id
+        self.filename = filename
+        self.page_parallel = page_parallel  # None表示按页数自动选择
+        self.workspace = workspace
+        self.pdf_path = workspace / "input.pdf"
+        self.output_dir = workspace / "output"
+        self.status = "queued"  # queued / running / done / failed
+        self.pages_done = 0
+        self.pages_total = None
+        self.markdown_path = None
+        self.docx_path = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.future = None
+        self.cache_key = None
+        self.cached = False
+        self.pages_ocr = 0  # 实际经过OCR的页数（不含缓存命中的页）
+        self.timings = {}  # 各阶段耗时（秒）
+        self.queued_at = None
+        self.events = []  # 进度事件记录，新的订阅者从头回放
+        self._subscribers = []  # (事件循环, asyncio.Event)
+
+    def publish(self, event, data):
+        """记录一条进度事件并通知所有订阅者，可以在工作线程中调用"""
+        self.events.append({"event": event, "data": data})
+        for loop, notify in list(self._subscribers):
+            loop.call_soon_threadsafe(notify.set)
+
+    def set_status(self, status):
+        self.status = status
+        self.publish("status", self.to_dict())
+
+    def page_done(self, page_number, markdown_texts):
+        """一页识别完成（或从缓存取得），推送该页的Markdown"""
+        self.pages_done += 1
+        data = self.progress()
+        data.update({"page": page_number, "markdown": markdown_texts})
+        self.publish("page", data)
+
+    async def stream_events(self):
+        """
+        以Server-Sent Events格式输出进度事件，任务结束后停止
+        """
+        notify = asyncio.Event()
+        subscriber = (asyncio.get_running_loop(), notify)
+        self._subscribers.append(subscriber)
+        try:
+            sent = 0
+            while True:
+                notify.clear()
+                while sent < len(self.events):
+                    event = self.events[sent]
+                    sent += 1
+                    yield f"event: {event['event']}\ndata: {json.dumps(event['data'], ensure_ascii=False)}\n\n"
+                    if event['event'] == "status" and event['data']['status'] in ("done", "failed"):
+                        return
+                try:
+                    await asyncio.wait_for(notify.wait(), timeout=15)
+                except asyncio.TimeoutError:
+                    # 保持连接，防止代理断开空闲连接
+                    yield ": keepalive\n\n"
+        finally:
+            self._subscribers.remove(subscriber)
+
+    def progress(self):
+        percent = None
+        if self.pages_total:
+            percent = round(self.pages_done * 100 / self.pages_total, 1)
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "pages_done": self.pages_done,
+            "pages_total": self.pages_total,
+            "percent": percent,
+        }
+
+    def to_dict(self):
+        info = self.progress()
+        info.update({
+            "filename": self.filename,
+            "error": self.error,
+            "created": self.created,
+            "finished": self.finished,
+            "has_markdown": self.markdown_path is not None,
+            "has_docx": self.docx_path is not None,
+            "cached": self.cached,
+            "timings": {stage: round(seconds, 3) for stage, seconds in self.timings.items()},
+        })
+        return info
+
+
+jobs = {}
+jobs_lock = threading.Lock()
+job_executor = ThreadPoolExecutor(max_workers=job_workers, thread_name_prefix="ocr-job")
+
+
+def count_pdf_pages(pdf_path):
+    """读取PDF页数，失败时返回None"""
+    try:
+        return len(PdfReader(str(pdf_path)).pages)
+    except Exception as e:
+        logger.warning("读取PDF页数失败: %s", e)
+        return None
+
+
+def use_page_parallel(job, page_count):
+    """判断任务是否使用分页并行模式，未指定时按待识别的页数自动选择"""
+    if page_parallel_workers <= 0 or not page_count:
+        return False
+    if job.page_parallel is not None:
+        return job.page_parallel
+    return page_count >= page_parallel_min_pages
+
+
+def ocr_with_pipeline(job, pipeline, pdf_path, page_numbers):
+    """用一个管线逐页处理整个PDF，每识别完一页立即推送进度"""
     markdown_list = []
-    for res in output:
-        save_img(res.markdown)
-        print(res.markdown)
-        markdown_list.append(res.markdown)
-    
-    markdown_texts = pipeline.concatenate_markdown_pages(markdown_list)
-    
-    # 保存Markdown文件
-    mkd_file_path = Path("output") / f"{Path(file.filename).stem}.md"
-    mkd_file_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    with open(mkd_file_path, "w", encoding="utf-8") as f:
-        f.write(markdown_texts)
-    save_docx(mkd_file_path)
-    # 返回Markdown文件
-    return FileResponse(mkd_file_path, media_type="text/markdown", filename=mkd_file_path.name)
-
-def save_img(data):
-    # 保存图片
-    for img_path, img_obj in data['markdown_images'].items():
-        # 创建目录（如果不存在）
-        os.makedirs(Path("output")/os.path.dirname(img_path), exist_ok=True)
-        # 保存图片
-        img_obj.save(Path("output")/img_path)
-        print(f"图片已保存到: {img_path}")
+    image_futures = []
+    with stage_timer(job, "predict"):
+        for res in pipeline.predict(str(pdf_path)):
+            # res.markdown每次访问都会重新生成，只取一次
+            data = res.markdown
+            # 图片在线程池中保存，与后续页面的识别并行
+            image_futures.extend(save_img(data, job.output_dir))
+            logger.debug("第%d页识别结果: %s", len(markdown_list) + 1, data['markdown_texts'])
+            # 读取页数失败时没有页码列表，按识别顺序编号
+            position = len(markdown_list)
+            page_number = page_numbers[position] if position < len(page_numbers) else position + 1
+            job.pages_ocr += 1
+            job.page_done(page_number, data['markdown_texts'])
+            markdown_list.append(page_without_images(data))
+    with stage_timer(job, "save_img"):
+        wait_for_images(image_futures)
+    return markdown_list
+
+
+_page_executor = None
+_page_executor_lock = threading.Lock()
+
+
+def get_page_executor():
+    """
+    按需创建分页并行使用的进程池，子进程只导入paddle_ocr_worker，
+    不会重复执行本模块导入时的初始化（扫描缓存目录、挂载静态文件等）
+    """
+    global _page_executor
+    with _page_executor_lock:
+        if _page_executor is None:
+            config = dict(pipeline_config)
+            config.setdefault("device", "cpu")
+            config.setdefault("cpu_threads", max(1, (os.cpu_count() or 1) // page_parallel_workers))
+            _page_executor = ProcessPoolExecutor(
+                max_workers=page_parallel_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_page_worker,
+                initargs=(config,),
+            )
+        return _page_executor
+
+
+def reset_page_executor(executor):
+    """
+    丢弃已损坏的进程池（子进程被OOM杀死、模型加载失败等），下一个任务重新创建
+    """
+    global _page_executor
+    with _page_executor_lock:
+        if _page_executor is executor:
+            _page_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def split_page_ranges(job, pdf_path, page_count):
+    """按page_chunk_size把PDF拆分成多个页码段，拆分失败时抛出原始异常"""
+    chunk_dir = job.workspace / "chunks"
+    chunk_dir.mkdir(parents=True, exist_ok=True)
+    chunks = []
+    for start_page in range(1, page_count + 1, page_chunk_size):
+        end_page = min(start_page + page_chunk_size - 1, page_count)
+        chunk_path = chunk_dir / f"pages_{start_page}_{end_page}.pdf"
+        # split_pdf.split_pdf会print并吞掉异常，服务中用extract_pages
+        extract_pages(str(pdf_path), range(start_page, end_page + 1), str(chunk_path))
+        chunks.append(chunk_path)
+    return chunks
+
+
+def ocr_page_parallel(job, pdf_path, page_numbers):
+    """
+    分页并行模式：拆分PDF后分发到进程池，按页码顺序重新组合每页的Markdown
+    """
+    try:
+        with stage_timer(job, "split_pdf"):
+            chunks = split_page_ranges(job, pdf_path, len(page_numbers))
+        with stage_timer(job, "predict"):
+            return run_page_chunks(job, chunks, page_numbers)
+    finally:
+        shutil.rmtree(job.workspace / "chunks", ignore_errors=True)
+
+
+def run_page_chunks(job, chunks, page_numbers):
+    """
+    把各页码段提交到进程池，每完成一段就推送其中各页的进度
+
+    任一段失败时取消其余尚未开始的段；进程池损坏时将其丢弃并抛出BrokenProcessPool
+    """
+    executor = get_page_executor()
+    futures = {}
+    results = [None] * len(chunks)
+    try:
+        for index, chunk_path in enumerate(chunks):
+            futures[executor.submit(ocr_page_range, str(chunk_path), str(job.output_dir))] = index
+        for future in as_completed(futures):
+            index = futures[future]
+            markdown_pages = future.result()
+            results[index] = markdown_pages
+            first = index * page_chunk_size
+            for offset, page in enumerate(markdown_pages):
+                job.pages_ocr += 1
+                job.page_done(page_numbers[first + offset], page['markdown_texts'])
+    except Exception as e:
+        for future in futures:
+            future.cancel()
+        if isinstance(e, BrokenProcessPool):
+            reset_page_executor(executor)
+        raise
+    return [page for markdown_pages in results for page in markdown_pages]
+
+
+def load_cached_pages(job):
+    """
+    按页面指纹查询单页缓存，返回(每页的markdown，未命中为None, 每页的缓存键)
+    """
+    if not page_cache.enabled or not job.pages_total:
+        return [], []
+    try:
+        fingerprints = page_fingerprints(job.pdf_path)
+    except Exception as e:
+        logger.warning("计算页面指纹失败: %s", e)
+        return [], []
+    page_keys = [PageCache.make_key(fingerprint, cache_config()) for fingerprint in fingerprints]
+    markdown_list = []
+    for page_number, key in enumerate(page_keys, start=1):
+        page = page_cache.get(key, job.output_dir)
+        if page is not None:
+            job.page_done(page_number, page['markdown_texts'])
+        markdown_list.append(page)
+    return markdown_list, page_keys
+
+
+def run_job(job):
+    """
+    在工作线程中执行转换：OCR、拼接Markdown、生成docx
+    """
+    if job.queued_at is not None:
+        job.timings["queue_wait"] = time.time() - job.queued_at
+    job.pages_total = count_pdf_pages(job.pdf_path)
+    job.set_status("running")
+    try:
+        with stage_timer(job, "page_cache"):
+            markdown_list, page_keys = load_cached_pages(job)
+        missing = [index for index, page in enumerate(markdown_list) if page is None]
+        need_ocr = bool(missing) or not markdown_list
+        pdf_path, page_numbers = job.pdf_path, list(range(1, (job.pages_total or 0) + 1))
+        if markdown_list and 0 < len(missing) < len(markdown_list):
+            # 只识别没有缓存的页面
+            pdf_path, page_numbers = job.workspace / "pending.pdf", [index + 1 for index in missing]
+            extract_pages(str(job.pdf_path), page_numbers, str(pdf_path))
+            logger.info("任务 %s 单页缓存命中 %d/%d 页，识别剩余 %d 页", job.id, len(markdown_list) - len(missing), len(markdown_list), len(missing))
+
+        page_parallel = need_ocr and use_page_parallel(job, len(missing) or job.pages_total)
+        fresh_pages = []
+        if page_parallel:
+            pages_done, pages_ocr = job.pages_done, job.pages_ocr
+            try:
+                fresh_pages = ocr_page_parallel(job, pdf_path, page_numbers)
+            except BrokenProcessPool as e:
+                # 进程池已丢弃，本任务改用常驻管线重新识别，进度从分页并行开始前恢复
+                logger.warning("任务 %s 分页并行进程池异常，改用常驻管线识别: %s", job.id, e)
+                job.pages_done, job.pages_ocr = pages_done, pages_ocr
+                page_parallel = False
+        with stage_timer(job, "pipeline_checkout"):
+            pipeline = pipeline_pool.checkout()
+        try:
+            if need_ocr and not page_parallel:
+                fresh_pages = ocr_with_pipeline(job, pipeline, pdf_path, page_numbers)
+            if markdown_list:
+                if len(fresh_pages) != len(missing):
+                    raise RuntimeError(f"识别结果页数不符: 期望{len(missing)}页，实际{len(fresh_pages)}页")
+                with stage_timer(job, "page_cache"):
+                    for index, page in zip(missing, fresh_pages):
+                        markdown_list[index] = page
+                        page_cache.put(page_keys[index], page, job.output_dir)
+            else:
+                markdown_list = fresh_pages
+            with stage_timer(job, "concatenate"):
+                markdown_texts = pipeline.concatenate_markdown_pages(markdown_list)
+        finally:
+            pipeline_pool.checkin(pipeline)
+
+        # 保存Markdown文件
+        mkd_file_path = job.output_dir / f"{Path(job.filename).stem}.md"
+        mkd_file_path.parent.mkdir(parents=True, exist_ok=True)
+        with stage_timer(job, "save_markdown"):
+            with open(mkd_file_path, "w", encoding="utf-8") as f:
+                f.write(markdown_texts)
+        job.markdown_path = mkd_file_path
+        with stage_timer(job, "save_docx"):
+            job.docx_path = save_docx(mkd_file_path)
+        with stage_timer(job, "result_cache"):
+            result_cache.put(job.cache_key, job.markdown_path, job.docx_path, job.output_dir)
+        job.finished = time.time()
+        job.set_status("done")
+    except Exception as e:
+        logger.exception("任务 %s 转换失败: %s", job.id, e)
+        job.error = str(e)
+        job.finished = time.time()
+        job.set_status("failed")
+    finish_job(job)
+    return job
+
+
+def finish_job(job):
+    """记录任务指标，并输出一行结构化的耗时日志"""
+    metrics.observe_job(job)
+    ocr_seconds = job.timings.get("predict")
+    logger.info("任务耗时 %s", json.dumps({
+        "job_id": job.id,
+        "status": job.status,
+        "cached": job.cached,
+        "pages_total": job.pages_total,
+        "pages_ocr": job.pages_ocr,
+        "pages_per_sec": round(job.pages_ocr / ocr_seconds, 3) if job.pages_ocr and ocr_seconds else None,
+        "timings": {stage: round(seconds, 3) for stage, seconds in job.timings.items()},
+    }, ensure_ascii=False))
+
+
+async def submit_job(file, page_parallel=None):
+    """
+    保存上传文件并提交转换任务；命中结果缓存时直接完成，排队任务过多时返回429
+    """
+    job_id = uuid.uuid4().hex
+    job = ConversionJob(job_id, Path(file.filename or f"{job_id}.pdf").name, workspace_root / job_id, page_parallel)
+    await run_in_threadpool(job.output_dir.mkdir, parents=True, exist_ok=True)
+    # 分块写入上传文件，避免整个PDF读入内存，同时计算内容哈希；文件读写放到线程池，不阻塞事件循环
+    content_hash = hashlib.sha256()
+    with stage_timer(job, "upload"):
+        f = await run_in_threadpool(open, job.pdf_path, "wb")
+        try:
+            while True:
+                chunk = await file.read(upload_chunk_size)
+                if not chunk:
+                    break
+                content_hash.update(chunk)
+                await run_in_threadpool(f.write, chunk)
+        finally:
+            await run_in_threadpool(f.close)
+    job.cache_key = ResultCache.make_key(content_hash.hexdigest(), cache_config())
+
+    with stage_timer(job, "result_cache"):
+        cached = await run_in_threadpool(result_cache.get, job.cache_key, job.output_dir, Path(job.filename).stem)
+    if cached is not None:
+        job.markdown_path, job.docx_path = cached
+        job.pages_total = await run_in_threadpool(count_pdf_pages, job.pdf_path)
+        # 页数未知（PyPDF2读取失败）时不计入已完成页数
+        job.pages_done = job.pages_total or 0
+        job.cached = True
+        job.finished = time.time()
+        job.set_status("done")
+        finish_job(job)
+        job.future = Future()
+        job.future.set_result(job)
+        with jobs_lock:
+            jobs[job_id] = job
+        return job
+
+    with jobs_lock:
+        queued = sum(1 for queued_job in jobs.values() if queued_job.status == "queued")
+        if queued < max_queued_jobs:
+            jobs[job_id] = job
+    if queued >= max_queued_jobs:
+        await run_in_threadpool(shutil.rmtree, job.workspace, ignore_errors=True)
+        raise HTTPException(status_code=429, detail="转换队列已满，请稍后重试")
+    job.queued_at = time.time()
+    job.set_status("queued")
+    job.future = job_executor.submit(run_job, job)
+    return job
+
+
+def cleanup_workspaces():
+    """
+    删除超过保留时间的任务及其工作目录，正在排队或执行的任务不会被清理
+    """
+    expire_before = time.time() - workspace_ttl
+    with jobs_lock:
+        expired = [job for job in jobs.values() if job.finished is not None and job.finished < expire_before]
+        for job in expired:
+            del jobs[job.id]
+        active = set(jobs)
+    for job in expired:
+        shutil.rmtree(job.workspace, ignore_errors=True)
+    # 清理服务重启前遗留的工作目录
+    if workspace_root.exists():
+        for path in workspace_root.iterdir():
+            if path.name not in active and path.stat().st_mtime < expire_before:
+                shutil.rmtree(path, ignore_errors=True)
+    if expired:
+        logger.info("已清理 %d 个过期任务", len(expired))
+
+
+async def cleanup_workspaces_periodically():
+    while True:
+        await asyncio.sleep(workspace_cleanup_interval)
+        try:
+            await run_in_threadpool(cleanup_workspaces)
+        except Exception as e:
+            logger.warning("清理工作目录失败: %s", e)
+
+
+def get_job(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job
+
+
+@app.post("/convert")
+async def convert_pdf_to_markdown(file: UploadFile = File(...), page_parallel: Optional[bool] = Form(None)):
+    """
+    接收PDF文件并转换为Markdown，等待转换完成后直接返回文件
+    """
+    job = await submit_job(file, page_parallel)
+    # 在事件循环中等待工作线程完成，不阻塞其他请求
+    await asyncio.wrap_future(job.future)
+    if job.status != "done":
+        raise HTTPException(status_code=500, detail=f"转换失败: {job.error}")
+    return FileResponse(job.markdown_path, media_type="text/markdown", filename=job.markdown_path.name)
+
+@app.post("/jobs", status_code=202)
+async def create_job(file: UploadFile = File(...), page_parallel: Optional[bool] = Form(None)):
+    """
+    提交转换任务，立即返回任务ID
+    """
+    job = await submit_job(file, page_parallel)
+    return job.progress()
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """
+    查询任务状态
+    """
+    return get_job(job_id).to_dict()
+
+@app.get("/jobs/{job_id}/progress")
+async def get_job_progress(job_id: str):
+    """
+    查询任务进度（已处理页数/总页数）
+    """
+    return get_job(job_id).progress()
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """
+    通过Server-Sent Events推送任务进度和每页识别出的Markdown
+    """
+    job = get_job(job_id)
+    return StreamingResponse(
+        job.stream_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/jobs/{job_id}/markdown")
+async def download_job_markdown(job_id: str):
+    """
+    下载转换生成的Markdown文件
+    """
+    job = get_job(job_id)
+    if job.markdown_path is None:
+        raise HTTPException(status_code=409, detail=f"任务尚未完成: {job.status}")
+    return FileResponse(job.markdown_path, media_type="text/markdown", filename=job.markdown_path.name)
+
+@app.get("/jobs/{job_id}/docx")
+async def download_job_docx(job_id: str):
+    """
+    下载转换生成的Word文件
+    """
+    job = get_job(job_id)
+    if job.docx_path is None:
+        raise HTTPException(status_code=409, detail=f"Word文件不可用: {job.status}")
+    docx_path = Path(job.docx_path)
+    return FileResponse(
+        docx_path,
+        media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        filename=docx_path.name,
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Prometheus格式的服务指标：队列深度、管线池利用率、各阶段耗时、吞吐量和峰值内存
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """
+    结果缓存和单页缓存的命中/未命中次数和占用空间
+    """
+    return {"results": result_cache.stats(), "pages": page_cache.stats()}
+
+@app.get("/ready")
+async def get_ready():
+    """
+    就绪检查：模型全部加载完成后返回200，否则返回503
+    """
+    status = {
+        "ready": pipeline_pool.ready,
+        "loaded": pipeline_pool.loaded,
+        "size": pipeline_pool.size,
+        "error": pipeline_pool.error,
+    }
+    return JSONResponse(status, status_code=200 if pipeline_pool.ready else 503)
 
 def save_docx(markdown_file):
     try:
         docx_path = markdown_to_docx_with_images(markdown_file)
-        print(f"转换成功！生成的Word文档: {docx_path}")
+        logger.info("生成Word文档: %s", docx_path)
+        return docx_path
     except Exception as e:
-        print(f"转换失败: {e}")
+        logger.error("Word文档生成失败: %s", e)
+        return None
 
 @app.get("/", response_class=HTMLResponse)
 async def get_upload_page():
@@ -134,6 +1120,33 @@ async def get_upload_page():
             color: #0c5460;
             border: 1px solid #bee5eb;
         }
+        .progress {
+            height: 8px;
+            background-color: #eee;
+            border-radius: 4px;
+            overflow: hidden;
+        }
+        #progress-bar {
+            height: 100%;
+            width: 0;
+            background-color: #007bff;
+            transition: width 0.3s;
+        }
+        #downloads a {
+            margin-right: 20px;
+        }
+        #preview {
+            max-height: 500px;
+            overflow-y: auto;
+            border: 1px solid #ddd;
+            border-radius: 5px;
+            padding: 0 10px;
+        }
+        .page pre {
+            white-space: pre-wrap;
+            word-break: break-all;
+            font-size: 13px;
+        }
     </style>
     <script>
         async function handleSubmit(event) {
@@ -156,50 +1169,130 @@ async def get_upload_page():
             
             try {
                 const formData = new FormData(event.target);
-                const response = await fetch('/convert', {
+                const response = await fetch('/jobs', {
                     method: 'POST',
                     body: formData
                 });
                 
                 if (response.ok) {
-                    // 获取上传文件的基本名称并替换扩展名为.md
-                    const originalFilename = fileInput.files[0].name;
-                    const baseName = originalFilename.substring(0, originalFilename.lastIndexOf('.')) || originalFilename;
-                    let filename = baseName + '.md';
-                    const contentDisposition = response.headers.get('Content-Disposition');
-                    if (contentDisposition) {
-                        const filenameMatch = contentDisposition.match(/filename=(.+)/);
-                        if (filenameMatch) {
-                            filename = filenameMatch[1].replace(/"/g, '');
-                        }
-                    }
-                    
-                    // 下载文件
-                    const blob = await response.blob();
-                    const url = window.URL.createObjectURL(blob);
-                    const a = document.createElement('a');
-                    a.href = url;
-                    a.download = filename;
-                    a.style.display = 'none';
-                    document.body.appendChild(a);
-                    a.click();
-                    document.body.removeChild(a);
-                    window.URL.revokeObjectURL(url);
-                    
-                    showStatus(`转换成功！文件 "${filename}" 已开始下载。`, 'success');
+                    // 提交成功后通过事件流接收进度
+                    const job = await response.json();
+                    showStatus('已提交，排队中...', 'loading');
+                    watchJob(job.job_id);
                 } else {
                     const errorText = await response.text();
                     showStatus(`转换失败：${response.status} - ${errorText}`, 'error');
+                    resetButton();
                 }
             } catch (error) {
                 showStatus(`网络错误：${error.message}`, 'error');
-            } finally {
-                // 恢复按钮状态
-                submitButton.disabled = false;
-                submitButton.textContent = '转换';
+                resetButton();
             }
         }
         
+        function resetButton() {
+            // 恢复按钮状态
+            const submitButton = document.querySelector('button[type="submit"]');
+            submitButton.disabled = false;
+            submitButton.textContent = '转换';
+        }
+        
+        function watchJob(jobId) {
+            const preview = document.getElementById('preview');
+            preview.innerHTML = '';
+            preview.style.display = 'block';
+            document.getElementById('progress').style.display = 'block';
+            document.getElementById('downloads').style.display = 'none';
+            
+            // 连接断开时EventSource会自动重连，服务端从头回放事件，已显示的页面会被覆盖
+            const source = new EventSource(`/jobs/${jobId}/events`);
+            source.addEventListener('page', (event) => {
+                const data = JSON.parse(event.data);
+                updateProgress(data);
+                showPage(data.page, data.markdown);
+            });
+            source.addEventListener('status', (event) => {
+                const data = JSON.parse(event.data);
+                updateProgress(data);
+                if (data.status === 'done') {
+                    source.close();
+                    showDownloads(jobId, data);
+                    downloadFile(`/jobs/${jobId}/markdown`);
+                    const message = data.cached ? '转换成功（使用缓存结果）！Markdown文件已开始下载。' : '转换成功！Markdown文件已开始下载。';
+                    showStatus(message, 'success');
+                    resetButton();
+                } else if (data.status === 'failed') {
+                    source.close();
+                    showStatus(`转换失败：${data.error}`, 'error');
+                    resetButton();
+                }
+            });
+        }
+        
+        function updateProgress(data) {
+            const bar = document.getElementById('progress-bar');
+            if (data.status === 'queued') {
+                showStatus('排队中...', 'loading');
+                return;
+            }
+            if (data.pages_total) {
+                bar.style.width = `${data.percent}%`;
+                if (data.status === 'running') {
+                    showStatus(`正在转换：已完成 ${data.pages_done}/${data.pages_total} 页`, 'loading');
+                }
+            } else if (data.status === 'running') {
+                showStatus(`正在转换：已完成 ${data.pages_done} 页`, 'loading');
+            }
+        }
+        
+        function showPage(pageNumber, markdown) {
+            // 按页码顺序插入每页的Markdown，并行识别时页面可能乱序到达
+            const preview = document.getElementById('preview');
+            let pageDiv = document.getElementById(`page-${pageNumber}`);
+            if (!pageDiv) {
+                pageDiv = document.createElement('div');
+                pageDiv.id = `page-${pageNumber}`;
+                pageDiv.className = 'page';
+                pageDiv.dataset.page = pageNumber;
+                const next = Array.from(preview.children).find((child) => Number(child.dataset.page) > pageNumber);
+                preview.insertBefore(pageDiv, next || null);
+            }
+            pageDiv.innerHTML = '';
+            const title = document.createElement('h4');
+            title.textContent = `第 ${pageNumber} 页`;
+            const content = document.createElement('pre');
+            content.textContent = markdown;
+            pageDiv.appendChild(title);
+            pageDiv.appendChild(content);
+        }
+        
+        function showDownloads(jobId, data) {
+            const downloads = document.getElementById('downloads');
+            downloads.innerHTML = '';
+            const links = [[`/jobs/${jobId}/markdown`, '下载Markdown']];
+            if (data.has_docx) {
+                links.push([`/jobs/${jobId}/docx`, '下载Word']);
+            }
+            for (const [href, text] of links) {
+                const a = document.createElement('a');
+                a.href = href;
+                a.textContent = text;
+                downloads.appendChild(a);
+            }
+            downloads.style.display = 'block';
+        }
+        
+        function downloadFile(url) {
+            // 文件名由服务端的Content-Disposition决定
+            const a = document.createElement('a');
+            a.href = url;
+            a.download = '';
+            a.style.display = 'none';
+            document.body.appendChild(a);
+            a.click();
+            document.body.removeChild(a);
+        }
+        
         function showStatus(message, type) {
             const statusDiv = document.getElementById('status');
             statusDiv.textContent = message;
@@ -238,11 +1331,15 @@ async def get_upload_page():
     </div>
     
     <div id="status" class="status" style="display: none;"></div>
+    <div id="progress" class="progress" style="display: none;"><div id="progress-bar"></div></div>
+    <div id="downloads" class="status" style="display: none;"></div>
+    <div id="preview" style="display: none;"></div>
     
     <div style="margin-top: 30px; font-size: 14px; color: #666;">
         <h3>使用说明：</h3>
         <ul>
             <li>支持PDF文件转换为Markdown格式</li>
+            <li>转换过程中会实时显示每页的识别结果</li>
             <li>转换完成后会自动下载Markdown文件</li>
             <li>请确保PDF文件清晰可读，以获得最佳转换效果</li>
         </ul>
@@ -252,4 +1349,4 @@ async def get_upload_page():
     """
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8083,log_level="debug")
+    uvicorn.run(app, host="0.0.0.0", port=8083, log_level=log_level.lower())
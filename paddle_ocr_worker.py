@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from paddleocr import PPStructureV3
+import os
+
+'''
+    paddle_ocr_web的页面识别和图片保存逻辑。
+    分页并行模式下进程池以spawn方式启动子进程，子进程只导入本模块，
+    因此本模块导入时不能有副作用（不扫描缓存目录、不挂载路由、不配置日志）。
+'''
+
+# 配置变量
+image_save_workers = int(os.environ.get("IMAGE_SAVE_WORKERS", "4"))  # 保存图片的线程数
+# 图片保存格式：空表示沿用PaddleOCR给出的扩展名，可选png/jpeg（python-docx不支持嵌入WebP）
+image_save_format = os.environ.get("IMAGE_SAVE_FORMAT", "").lower()
+image_save_quality = int(os.environ.get("IMAGE_SAVE_QUALITY", "85"))  # JPEG质量
+png_compress_level = int(os.environ.get("PNG_COMPRESS_LEVEL", "6"))  # PNG压缩级别0-9，越小写入越快
+if image_save_format not in ("", "png", "jpeg"):
+    raise ValueError(f"不支持的图片保存格式: {image_save_format}，可选png/jpeg")
+
+# 线程池在第一次提交任务时才创建线程
+image_executor = ThreadPoolExecutor(max_workers=image_save_workers, thread_name_prefix="img-save")
+
+_worker_pipeline = None
+
+
+def init_page_worker(config):
+    # 每个子进程加载一份CPU管线
+    global _worker_pipeline
+    _worker_pipeline = PPStructureV3(**config)
+
+
+def ocr_page_range(chunk_path, output_dir):
+    """
+    在子进程中处理一段页码，图片直接保存到任务输出目录，只把Markdown文本传回主进程
+    """
+    markdown_list = []
+    image_futures = []
+    for res in _worker_pipeline.predict(chunk_path):
+        data = res.markdown
+        image_futures.extend(save_img(data, output_dir))
+        markdown_list.append(page_without_images(data))
+    wait_for_images(image_futures)
+    return markdown_list
+
+
+def save_img(data, output_dir):
+    """
+    把一页的图片提交到线程池保存，返回Future列表。
+    配置了image_save_format时会修改data中的图片路径和Markdown里的引用
+    """
+    output_dir = Path(output_dir)
+    if image_save_format:
+        rename_images(data)
+    images = data['markdown_images']
+    # 创建目录（如果不存在），每个目录只创建一次
+    for directory in {os.path.dirname(img_path) for img_path in images}:
+        os.makedirs(output_dir/directory, exist_ok=True)
+    return [image_executor.submit(write_image, img_obj, output_dir/img_path) for img_path, img_obj in images.items()]
+
+def rename_images(data):
+    """按image_save_format替换图片扩展名，并同步修改Markdown中的图片路径"""
+    suffix = ".jpg" if image_save_format == "jpeg" else ".png"
+    markdown_texts = data['markdown_texts']
+    renamed = {}
+    for img_path, img_obj in data['markdown_images'].items():
+        new_path = os.path.splitext(img_path)[0] + suffix
+        if new_path != img_path:
+            markdown_texts = markdown_texts.replace(img_path, new_path)
+        renamed[new_path] = img_obj
+    data['markdown_texts'] = markdown_texts
+    data['markdown_images'] = renamed
+
+def write_image(img_obj, target):
+    # 目标可能是缓存文件的硬链接，先删除再写入，避免改动缓存内容
+    if target.exists():
+        target.unlink()
+    # 保存图片
+    if target.suffix.lower() in (".jpg", ".jpeg"):
+        if img_obj.mode not in ("RGB", "L"):
+            img_obj = img_obj.convert("RGB")
+        img_obj.save(target, "JPEG", quality=image_save_quality, optimize=True)
+    elif target.suffix.lower() == ".png":
+        img_obj.save(target, "PNG", compress_level=png_compress_level)
+    else:
+        img_obj.save(target)
+
+def wait_for_images(image_futures):
+    """等待图片全部写完，保存失败时抛出异常"""
+    for future in image_futures:
+        future.result()
+
+def page_without_images(data):
+    """图片提交保存后只保留路径，释放图片对象占用的内存"""
+    page = dict(data)
+    page['markdown_images'] = dict.fromkeys(data['markdown_images'])
+    return page
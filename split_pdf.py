@@ -26,6 +26,17 @@ def split_pdf(input_path, start_page, end_page, output_path):
     except Exception as e:
         print(f"发生错误: {str(e)}")
 
+def extract_pages(input_path, page_numbers, output_path):
+    """按页码列表（从1开始，可以不连续）提取页面，保存为新的PDF"""
+    reader = PdfReader(input_path)
+    writer = PdfWriter()
+    for page_number in page_numbers:
+        if page_number < 1 or page_number > len(reader.pages):
+            raise ValueError(f"无效的页码: {page_number}")
+        writer.add_page(reader.pages[page_number - 1])
+    with open(output_path, 'wb') as output_file:
+        writer.write(output_file)
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='PDF文件拆分工具')
     parser.add_argument('--input', required=True, help='输入PDF文件路径')
@@ -12,6 +12,28 @@ from OCC.Core.Prs3d import Prs3d_PointAspect
 from OCC.Core.Aspect import Aspect_TOM_BALL
 from OCC.Core.AIS import AIS_Point
 from OCC.Core.Geom import Geom_CartesianPoint
+from OCC.Core.Bnd import Bnd_Box
+from OCC.Core.BRepPrimAPI import BRepPrimAPI_MakeBox, BRepPrimAPI_MakeCylinder
+from OCC.Core.BRepAlgoAPI import BRepAlgoAPI_Fuse
+from OCC.Core.TopoDS import TopoDS_Compound
+from OCC.Core.BRep import BRep_Builder
+from OCC.Core.gp import gp_Ax2, gp_Dir
+import argparse
+import itertools
+import random
+import time
+from bbox_sweep import find_candidate_pairs
+
+try:
+    from OCC.Core.BRepBndLib import brepbndlib_Add
+except ImportError:  # pythonocc 7.8 起只保留静态方法
+    from OCC.Core.BRepBndLib import brepbndlib
+    brepbndlib_Add = brepbndlib.Add
+
+# 两条边距离小于该值视为相交
+INTERSECTION_TOLERANCE = 1e-7
+# 交点去重的距离
+DUPLICATE_TOLERANCE = 1e-6
 
 def read_step_file(filename):
     """读取STEP文件并返回形状。"""
@@ -25,33 +47,104 @@ def read_step_file(filename):
         print("错误：无法读取文件。")
         return None
 
-def get_intersection_points(shape):
-    """查找形状中所有边的交点。"""
+def get_edges(shape):
+    """按 TopExp_Explorer 的遍历顺序收集形状中的所有边。"""
     edges = []
     exp = TopExp_Explorer(shape, TopAbs_EDGE)
     while exp.More():
         edges.append(topods.Edge(exp.Current()))
         exp.Next()
+    return edges
+
+def get_edge_boxes(edges, tolerance=INTERSECTION_TOLERANCE):
+    """
+    计算每条边的包围盒 (xmin, ymin, zmin, xmax, ymax, zmax)。
 
+    不使用三角化，包围盒由曲线本身计算并包含边的容差，再向外扩大 tolerance，
+    保证距离小于 tolerance 的两条边的包围盒一定相交。
+    空包围盒（如退化边）视为无穷大，始终进入精确检测。
+    """
+    inf = float('inf')
+    boxes = []
+    for edge in edges:
+        box = Bnd_Box()
+        brepbndlib_Add(edge, box, False)
+        if box.IsVoid():
+            boxes.append((-inf, -inf, -inf, inf, inf, inf))
+            continue
+        box.Enlarge(tolerance)
+        boxes.append(tuple(box.Get()))
+    return boxes
+
+def collect_intersection_points(edges, pairs):
+    """对给定的边对做精确距离检测，按顺序收集去重后的交点。"""
     intersection_points = []
-    for i in range(len(edges)):
-        for j in range(i + 1, len(edges)):
-            edge1 = edges[i]
-            edge2 = edges[j]
-            dist = BRepExtrema_DistShapeShape(edge1, edge2)
-            if dist.IsDone() and dist.Value() < 1e-7:
-                p1 = dist.PointOnShape1(1)
-                p2 = dist.PointOnShape2(1)
-                if p1.IsEqual(p2, 1e-6):
-                    is_duplicate = False
-                    for p in intersection_points:
-                        if p.IsEqual(p1, 1e-6):
-                            is_duplicate = True
-                            break
-                    if not is_duplicate:
-                        intersection_points.append(p1)
+    for i, j in pairs:
+        dist = BRepExtrema_DistShapeShape(edges[i], edges[j])
+        if dist.IsDone() and dist.Value() < INTERSECTION_TOLERANCE:
+            p1 = dist.PointOnShape1(1)
+            p2 = dist.PointOnShape2(1)
+            if p1.IsEqual(p2, DUPLICATE_TOLERANCE):
+                is_duplicate = False
+                for p in intersection_points:
+                    if p.IsEqual(p1, DUPLICATE_TOLERANCE):
+                        is_duplicate = True
+                        break
+                if not is_duplicate:
+                    intersection_points.append(p1)
     return intersection_points
 
+def get_intersection_points(shape):
+    """查找形状中所有边的交点，先用包围盒筛选候选边对，只对候选边对做精确检测。"""
+    edges = get_edges(shape)
+    pairs = find_candidate_pairs(get_edge_boxes(edges))
+    return collect_intersection_points(edges, pairs)
+
+def get_intersection_points_brute_force(shape):
+    """查找形状中所有边的交点，对所有边对做精确检测，用于校验。"""
+    edges = get_edges(shape)
+    return collect_intersection_points(edges, itertools.combinations(range(len(edges)), 2))
+
+def make_test_shape(count=20, seed=0):
+    """
+    生成用于校验的形状：随机摆放、相互重叠的长方体和圆柱，
+    再加上一个融合后的长方体和圆柱（融合会产生新的相交边）。
+    """
+    rng = random.Random(seed)
+    builder = BRep_Builder()
+    compound = TopoDS_Compound()
+    builder.MakeCompound(compound)
+    for k in range(count):
+        corner = gp_Pnt(rng.uniform(0, 50), rng.uniform(0, 50), rng.uniform(0, 50))
+        if k % 2:
+            solid = BRepPrimAPI_MakeCylinder(gp_Ax2(corner, gp_Dir(0, 0, 1)),
+                                             rng.uniform(2, 10), rng.uniform(5, 20)).Shape()
+        else:
+            solid = BRepPrimAPI_MakeBox(corner, rng.uniform(5, 20), rng.uniform(5, 20),
+                                        rng.uniform(5, 20)).Shape()
+        builder.Add(compound, solid)
+    box = BRepPrimAPI_MakeBox(gp_Pnt(60, 0, 0), 20, 20, 20).Shape()
+    cylinder = BRepPrimAPI_MakeCylinder(gp_Ax2(gp_Pnt(70, 10, -5), gp_Dir(0, 0, 1)), 5, 30).Shape()
+    builder.Add(compound, BRepAlgoAPI_Fuse(box, cylinder).Shape())
+    return compound
+
+def verify_intersection_search(shape):
+    """比较包围盒筛选与暴力遍历的结果，两者必须得到相同顺序的相同交点。"""
+    start = time.perf_counter()
+    fast = get_intersection_points(shape)
+    fast_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    brute = get_intersection_points_brute_force(shape)
+    brute_time = time.perf_counter() - start
+
+    edges = get_edges(shape)
+    edge_count = len(edges)
+    pair_count = len(find_candidate_pairs(get_edge_boxes(edges)))
+    print(f"边数 {edge_count}，候选边对 {pair_count} / {edge_count * (edge_count - 1) // 2}")
+    print(f"包围盒筛选 {len(fast)} 个交点 {fast_time:.2f}s，暴力遍历 {len(brute)} 个交点 {brute_time:.2f}s")
+    return len(fast) == len(brute) and all(p.IsEqual(q, 1e-9) for p, q in zip(fast, brute))
+
 def get_hole_elements(shape):
     """查找形状中所有孔洞的边和顶点。"""
     hole_edges = set()
@@ -86,12 +179,27 @@ def get_hole_elements(shape):
     return hole_edges, hole_vertices
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='STEP文件孔洞与交点可视化')
+    parser.add_argument('file', nargs='?', help='STEP文件路径')
+    parser.add_argument('--verify', action='store_true',
+                        help='在生成的形状（或指定的STEP文件）上校验包围盒筛选与暴力遍历结果一致')
+    parser.add_argument('--count', type=int, default=20, help='校验时生成的实体数量')
+    parser.add_argument('--seed', type=int, default=0, help='校验时的随机种子')
+    args = parser.parse_args()
+
+    if args.verify:
+        shapes = [make_test_shape(args.count, args.seed)]
+        if args.file:
+            shapes.append(read_step_file(args.file))
+        ok = all(verify_intersection_search(shape) for shape in shapes)
+        print("结果一致" if ok else "错误：包围盒筛选与暴力遍历结果不一致")
+        raise SystemExit(0 if ok else 1)
+
     # 初始化显示
     display, start_display, add_menu, add_function_to_menu = init_display()
     
     # 读取STEP文件
-    file_path = r"D:\DataSet\step_temp\00000001.stp"
-    my_shape = read_step_file(file_path)
+    my_shape = read_step_file(args.file or r"D:\DataSet\step_temp\00000001.stp")
 
     if my_shape:
         # 1. 获取所有几何数据
@@ -0,0 +1,56 @@
+import itertools
+import random
+
+import pytest
+
+from bbox_sweep import find_candidate_pairs
+
+
+def load_stp_visualizer():
+    # pythonocc无法用pip安装，没有时只跳过需要几何内核的测试
+    pytest.importorskip("OCC")
+    import stp_visualizer
+    return stp_visualizer
+
+
+def assert_same_points(fast, brute):
+    assert len(fast) == len(brute)
+    for p, q in zip(fast, brute):
+        assert p.IsEqual(q, 1e-9)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_broad_phase_matches_brute_force(seed):
+    stp_visualizer = load_stp_visualizer()
+    shape = stp_visualizer.make_test_shape(count=12, seed=seed)
+    fast = stp_visualizer.get_intersection_points(shape)
+    brute = stp_visualizer.get_intersection_points_brute_force(shape)
+    # 生成的实体互相重叠，必须能找到交点，否则比较没有意义
+    assert brute
+    assert_same_points(fast, brute)
+
+
+def test_broad_phase_prunes_pairs():
+    stp_visualizer = load_stp_visualizer()
+    shape = stp_visualizer.make_test_shape(count=12, seed=0)
+    edges = stp_visualizer.get_edges(shape)
+    pairs = find_candidate_pairs(stp_visualizer.get_edge_boxes(edges))
+    assert len(pairs) < len(edges) * (len(edges) - 1) // 2
+
+
+def test_candidate_pairs_match_box_overlap():
+    rng = random.Random(0)
+    inf = float('inf')
+    for _ in range(50):
+        boxes = []
+        for _ in range(rng.randrange(40)):
+            if rng.random() < 0.05:
+                boxes.append((-inf, -inf, -inf, inf, inf, inf))
+                continue
+            low = [rng.uniform(0, 10) for _ in range(3)]
+            boxes.append(tuple(low) + tuple(v + rng.uniform(0, 3) for v in low))
+        expected = [
+            (i, j) for i, j in itertools.combinations(range(len(boxes)), 2)
+            if all(boxes[i][k] <= boxes[j][k + 3] and boxes[j][k] <= boxes[i][k + 3] for k in range(3))
+        ]
+        assert find_candidate_pairs(boxes) == expected